@@ -0,0 +1,160 @@
+import os
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+_HEADER = "<IIH"  # Record sequence number, timestamp, payload length
+_HEADER_SIZE = 10
+_POINTER_FILE = "ptr"
+
+
+class FlashQueue:
+    """Persistent FIFO of fixed-size records, used to hold readings while offline.
+
+    Records are appended to segment files that rotate through max_segments
+    slots, so writes move across the filesystem instead of rewriting one
+    file, and the queue never uses more than max_segments * records_per_segment
+    * record_size bytes. When that cap is reached, starting a new segment
+    drops the oldest one. Fully read segments are deleted. The read position
+    is saved only on commit(), once per drained batch, and everything else is
+    rebuilt from the segment headers at start-up. A record torn by a power
+    cut is ignored, and writing resumes in a fresh segment.
+    """
+
+    def __init__(self, directory, record_size=256, records_per_segment=16, max_segments=16):
+        if record_size <= _HEADER_SIZE:
+            raise ValueError("record_size must be larger than the record header!")
+        self.directory = directory
+        self.record_size = record_size
+        self.records_per_segment = records_per_segment
+        self.max_segments = max_segments
+        self.dropped = 0  # Records lost because the queue was full
+        self._buf = bytearray(record_size)
+        try:
+            os.mkdir(directory)
+        except OSError:
+            pass  # Already exists
+        self._recover()
+
+    @property
+    def capacity_bytes(self):
+        return self.max_segments * self.records_per_segment * self.record_size
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def _path(self, segment):
+        return f"{self.directory}/{segment % self.max_segments}.seg"
+
+    def _recover(self):
+        rps = self.records_per_segment
+        first = None
+        head = 0
+        for slot in range(self.max_segments):
+            path = f"{self.directory}/{slot}.seg"
+            try:
+                with open(path, "rb") as f:
+                    if f.readinto(self._buf) != self.record_size:
+                        continue
+                    size = f.seek(0, 2)
+            except OSError:
+                continue
+            segment = struct.unpack_from(_HEADER, self._buf)[0] // rps
+            count = size // self.record_size
+            if size % self.record_size:
+                count = rps  # Torn record: never append behind it, start the next segment
+            if first is None or segment < first:
+                first = segment
+            head = max(head, segment * rps + count)
+        tail = self._load_pointer()
+        if first is None:
+            tail = head = max(head, tail)
+        else:
+            tail = min(max(tail, first * rps), head)
+        self.head = head
+        self.tail = tail
+
+    def _load_pointer(self):
+        try:
+            with open(f"{self.directory}/{_POINTER_FILE}", "rb") as f:
+                return struct.unpack("<I", f.read(4))[0]
+        except (OSError, ValueError):
+            return 0
+
+    def _save_pointer(self):
+        with open(f"{self.directory}/{_POINTER_FILE}", "wb") as f:
+            f.write(struct.pack("<I", self.tail))
+
+    def put(self, payload, timestamp):
+        """Append one record. payload (bytes or str) is cut to record_size - 10 bytes."""
+        if isinstance(payload, str):
+            payload = payload.encode()
+        rps = self.records_per_segment
+        seq = self.head
+        segment = seq // rps
+        if seq % rps == 0:
+            # New segment: it takes over the slot of the segment max_segments older.
+            oldest_end = (segment - self.max_segments + 1) * rps
+            if self.tail < oldest_end:
+                self.dropped += oldest_end - self.tail
+                self.tail = oldest_end
+            mode = "wb"
+        else:
+            mode = "ab"
+        length = min(len(payload), self.record_size - _HEADER_SIZE)
+        buf = self._buf
+        struct.pack_into(_HEADER, buf, 0, seq, timestamp, length)
+        buf[_HEADER_SIZE:_HEADER_SIZE + length] = payload[:length]
+        for i in range(_HEADER_SIZE + length, self.record_size):
+            buf[i] = 0
+        with open(self._path(segment), mode) as f:
+            f.write(buf)
+        self.head = seq + 1
+
+    def peek(self, max_records):
+        """Return up to max_records of the oldest unread records as (timestamp, payload) tuples."""
+        records = []
+        rps = self.records_per_segment
+        seq = self.tail
+        end = min(self.head, seq + max_records)
+        f = None
+        segment = -1
+        try:
+            while seq < end:
+                if seq // rps != segment:
+                    if f is not None:
+                        f.close()
+                    segment = seq // rps
+                    f = open(self._path(segment), "rb")
+                f.seek((seq % rps) * self.record_size)
+                f.readinto(self._buf)
+                rec_seq, timestamp, length = struct.unpack_from(_HEADER, self._buf)
+                if rec_seq == seq:
+                    records.append((timestamp, bytes(self._buf[_HEADER_SIZE:_HEADER_SIZE + length])))
+                else:
+                    records.append((0, None))  # Damaged or torn record, skipped on commit
+                seq += 1
+        finally:
+            if f is not None:
+                f.close()
+        return records
+
+    def commit(self, count):
+        """Mark the first count records as delivered and delete segments that are fully read."""
+        rps = self.records_per_segment
+        old_tail = self.tail
+        self.tail = min(self.head, self.tail + count)
+        for segment in range(old_tail // rps, self.tail // rps):
+            try:
+                os.remove(self._path(segment))
+            except OSError:
+                pass
+        if self.tail == self.head and self.tail % rps:
+            # Drained into the middle of the write segment: start a fresh one next time.
+            try:
+                os.remove(self._path(self.tail // rps))
+            except OSError:
+                pass
+            self.head = self.tail = (self.tail // rps + 1) * rps
+        self._save_pointer()
@@ -0,0 +1,329 @@
+import math
+from array import array
+
+G_MM_S2 = 9806.65  # 1 g in mm/s^2
+
+
+class AxisStats:
+    """Single-pass statistics for one accelerometer axis.
+
+    Uses Welford's update extended to the third and fourth central moments, so
+    a window of any length costs a handful of floats and no sample storage.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.sum_sq = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def add(self, x):
+        n1 = self.n
+        n = n1 + 1
+        self.n = n
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+        self.sum_sq += x * x
+        if n1 == 0:
+            self.min = self.max = x
+        elif x < self.min:
+            self.min = x
+        elif x > self.max:
+            self.max = x
+
+    @property
+    def rms(self):
+        return math.sqrt(self.sum_sq / self.n) if self.n else 0.0
+
+    @property
+    def peak(self):
+        """Largest absolute value seen in the window."""
+        return max(abs(self.min), abs(self.max))
+
+    @property
+    def peak_to_peak(self):
+        return self.max - self.min
+
+    @property
+    def crest_factor(self):
+        rms = self.rms
+        return self.peak / rms if rms else 0.0
+
+    @property
+    def variance(self):
+        """Population variance of the window."""
+        return self.m2 / self.n if self.n else 0.0
+
+    @property
+    def skewness(self):
+        if not self.m2:
+            return 0.0
+        return math.sqrt(self.n) * self.m3 / (self.m2 ** 1.5)
+
+    @property
+    def kurtosis(self):
+        """Kurtosis (not excess), ~3 for Gaussian noise, grows with impacts."""
+        if not self.m2:
+            return 0.0
+        return self.n * self.m4 / (self.m2 * self.m2)
+
+    def as_dict(self):
+        return {
+            "mean": self.mean,
+            "rms": self.rms,
+            "peak": self.peak,
+            "p2p": self.peak_to_peak,
+            "crest": self.crest_factor,
+            "var": self.variance,
+            "skew": self.skewness,
+            "kurt": self.kurtosis,
+        }
+
+
+class VibrationStats:
+    """Per-axis AxisStats for a window of (ax, ay, az) samples."""
+
+    def __init__(self):
+        self.x = AxisStats()
+        self.y = AxisStats()
+        self.z = AxisStats()
+
+    def reset(self):
+        self.x.reset()
+        self.y.reset()
+        self.z.reset()
+
+    def add(self, ax, ay, az):
+        self.x.add(ax)
+        self.y.add(ay)
+        self.z.add(az)
+
+    def rms(self):
+        return self.x.rms, self.y.rms, self.z.rms
+
+    def as_dict(self):
+        return {"n": self.x.n, "x": self.x.as_dict(), "y": self.y.as_dict(), "z": self.z.as_dict()}
+
+
+class Spectrum:
+    """Fixed-size power spectrum of one axis, for band-energy features.
+
+    All buffers (samples, Hann window, twiddles, bit-reversal table) are
+    allocated once; compute() runs an in-place iterative radix-2 FFT over the
+    captured window. size must be a power of two and sample_rate the rate the
+    window was captured at, otherwise the band edges are meaningless.
+    max_hz is the bandwidth of the sensor in front of the FFT (e.g. the
+    MPU6050 DLPF); None means the signal is good up to Nyquist.
+    """
+
+    def __init__(self, size, sample_rate):
+        if size < 2 or size & (size - 1):
+            raise ValueError('Spectrum size must be a power of two!')
+        self.size = size
+        self.sample_rate = sample_rate
+        self.max_hz = None
+        self.re = array('f', [0.0] * size)
+        self.im = array('f', [0.0] * size)
+        self.window = array('f', (0.5 - 0.5 * math.cos(2 * math.pi * i / size) for i in range(size)))
+        self._window_power = sum(w * w for w in self.window)
+        half = size // 2
+        self._cos = array('f', (math.cos(2 * math.pi * k / size) for k in range(half)))
+        self._sin = array('f', (math.sin(2 * math.pi * k / size) for k in range(half)))
+        bits = size.bit_length() - 1
+        self._rev = array('H', [0] * size)
+        for i in range(size):
+            r = 0
+            v = i
+            for _ in range(bits):
+                r = (r << 1) | (v & 1)
+                v >>= 1
+            self._rev[i] = r
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def add(self, x):
+        """Append one sample; samples past size are ignored until reset()."""
+        if self.count < self.size:
+            self.re[self.count] = x
+            self.count += 1
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def compute(self):
+        """Turn the captured window into |X[k]|^2 for k < size / 2, stored in re."""
+        n = self.size
+        re = self.re
+        im = self.im
+        window = self.window
+        mean = sum(re) / n  # Remove DC (gravity, offsets) so it does not leak into low bins
+        for i in range(n):
+            re[i] = (re[i] - mean) * window[i]
+            im[i] = 0.0
+        rev = self._rev
+        for i in range(n):
+            j = rev[i]
+            if j > i:
+                re[i], re[j] = re[j], re[i]
+        cos_t = self._cos
+        sin_t = self._sin
+        half = 1
+        while half < n:
+            step = n // (half * 2)
+            for start in range(0, n, half * 2):
+                k = 0
+                for j in range(start, start + half):
+                    l = j + half
+                    wr = cos_t[k]
+                    wi = sin_t[k]
+                    tr = wr * re[l] + wi * im[l]
+                    ti = wr * im[l] - wi * re[l]
+                    re[l] = re[j] - tr
+                    im[l] = im[j] - ti
+                    re[j] += tr
+                    im[j] += ti
+                    k += step
+            half *= 2
+        for k in range(n // 2):
+            re[k] = re[k] * re[k] + im[k] * im[k]
+
+    def band_rms(self, low_hz, high_hz):
+        """RMS of the signal between low_hz and high_hz (inclusive), in input units.
+
+        Call after compute(). Returns None for a band that lies entirely above
+        the Nyquist frequency of this window or above max_hz; a band that
+        straddles either is cut off there.
+        """
+        if self.max_hz is not None:
+            high_hz = min(high_hz, self.max_hz)
+        resolution = self.sample_rate / self.size
+        first = max(1, int(math.ceil(low_hz / resolution)))
+        last = min(self.size // 2 - 1, int(high_hz / resolution))
+        if first > last:
+            return None
+        power = 0.0
+        re = self.re
+        for k in range(first, last + 1):
+            power += re[k]
+        # One-sided spectrum, corrected for the energy the Hann window removes.
+        return math.sqrt(2 * power / (self.size * self._window_power))
+
+    def features(self, bands):
+        """Return [band_rms(low, high) for (low, high) in bands]."""
+        return [self.band_rms(low, high) for low, high in bands]
+
+
+class VelocityRMS:
+    """Velocity RMS in mm/s (the ISO 10816 severity measure) from acceleration in g.
+
+    Each sample runs, per axis, through a first-order (bilinear) high-pass at
+    drift_hz to strip gravity and offset drift, trapezoidal integration to
+    velocity, and a second-order Butterworth high-pass at cutoff_hz that both
+    removes the integration drift and sets the lower band edge. Keeping the
+    drift stage a decade below the band means the two do not stack: the band
+    edge is -3 dB at cutoff_hz and a 25 Hz tone reads about 1.3 % low with the
+    defaults. Only the filter state is kept, so it runs alongside
+    VibrationStats on the same sample stream. The first settle_samples of a
+    window only prime the filters and are left out of the RMS. The trapezoidal
+    rule reads low as content approaches Nyquist (about -3 % at
+    sample_rate / 10, -14 % at sample_rate / 5).
+
+    The upper edge is whatever low-pass sits in front: on the MPU6050 the
+    DLPF (184 Hz at DLPF_CFG 1), not the 1 kHz of the ISO 10816 band. The
+    result is a 10-184 Hz velocity RMS, which reads low against full-band
+    ISO 10816 limits wherever the machine has energy above the DLPF corner.
+    """
+
+    def __init__(self, sample_rate, cutoff_hz=10.0, drift_hz=0.5):
+        self.cutoff_hz = cutoff_hz
+        self.drift_hz = drift_hz
+        self._prev_acc = array('f', [0.0] * 3)
+        self._hp_acc = array('f', [0.0] * 3)
+        self._vel = array('f', [0.0] * 3)
+        self._z1 = array('f', [0.0] * 3)  # Band-edge biquad state (transposed direct form II)
+        self._z2 = array('f', [0.0] * 3)
+        self._sum_sq = array('f', [0.0] * 3)
+        self.set_sample_rate(sample_rate)
+        self.reset()
+
+    def set_sample_rate(self, sample_rate):
+        self.sample_rate = sample_rate
+        self._dt = 1.0 / sample_rate
+        k = math.tan(math.pi * self.drift_hz / sample_rate)
+        self._b0 = 1.0 / (1.0 + k)
+        self._a1 = (1.0 - k) / (1.0 + k)
+        k = math.tan(math.pi * self.cutoff_hz / sample_rate)
+        norm = 1.0 / (1.0 + math.sqrt(2.0) * k + k * k)
+        self._hb0 = norm
+        self._ha1 = 2.0 * (k * k - 1.0) * norm
+        self._ha2 = (1.0 - math.sqrt(2.0) * k + k * k) * norm
+        # Six time constants of the band edge; the drift stage starts from the first sample, so it has no step to settle.
+        self.settle_samples = int(6 * sample_rate / (2 * math.pi * self.cutoff_hz)) + 1
+
+    def reset(self):
+        for i in range(3):
+            self._hp_acc[i] = 0.0
+            self._vel[i] = 0.0
+            self._z1[i] = 0.0
+            self._z2[i] = 0.0
+            self._sum_sq[i] = 0.0
+        self.n = 0
+        self.count = 0
+
+    def _step(self, i, x):
+        b0 = self._b0
+        a1 = self._a1
+        hp_acc = b0 * (x - self._prev_acc[i]) + a1 * self._hp_acc[i]
+        vel = self._vel[i] + (self._hp_acc[i] + hp_acc) * 0.5 * self._dt
+        # Butterworth high-pass, numerator b0 * (1, -2, 1).
+        hb0 = self._hb0 * vel
+        hp_vel = hb0 + self._z1[i]
+        self._z1[i] = -2.0 * hb0 - self._ha1 * hp_vel + self._z2[i]
+        self._z2[i] = hb0 - self._ha2 * hp_vel
+        self._prev_acc[i] = x
+        self._hp_acc[i] = hp_acc
+        self._vel[i] = vel
+        return hp_vel
+
+    def add(self, ax, ay, az):
+        if self.count == 0:
+            # Start the high-pass from the first sample so gravity is not a step input.
+            self._prev_acc[0] = ax
+            self._prev_acc[1] = ay
+            self._prev_acc[2] = az
+        self.count += 1
+        vx = self._step(0, ax)
+        vy = self._step(1, ay)
+        vz = self._step(2, az)
+        if self.count > self.settle_samples:
+            self._sum_sq[0] += vx * vx
+            self._sum_sq[1] += vy * vy
+            self._sum_sq[2] += vz * vz
+            self.n += 1
+
+    def rms(self):
+        """Return (x, y, z) velocity RMS in mm/s, or None if the window was shorter than the settling time."""
+        if not self.n:
+            return None
+        n = self.n
+        return (
+            math.sqrt(self._sum_sq[0] / n) * G_MM_S2,
+            math.sqrt(self._sum_sq[1] / n) * G_MM_S2,
+            math.sqrt(self._sum_sq[2] / n) * G_MM_S2,
+        )
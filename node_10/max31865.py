@@ -1,6 +1,8 @@
 import math
 import time
+from array import array
 from micropython import const
+import uasyncio as asyncio
 import spi_device
 
 # Register and other constant values:
@@ -31,13 +33,86 @@ _MAX31865_FAULT_OVUV = const(0x04)
 _RTD_A = 3.9083e-3
 _RTD_B = -5.775e-7
 
+# Bias settling before a one-shot conversion, and the one-shot conversion time.
+_BIAS_SETTLE_MS = const(10)
+_ONESHOT_MS = const(65)
+# Time from enabling auto-convert until the first result is valid (50 Hz filter worst case).
+_AUTO_FIRST_MS = const(75)
+# One auto-convert period (50 Hz filter, 20 ms) plus margin: a fresh conversion is done after this.
+_AUTO_PERIOD_MS = const(25)
+
+# Config bits that clear themselves once the chip has acted on them.
+_CONFIG_SELF_CLEARING = const(_MAX31865_CONFIG_1SHOT | _MAX31865_CONFIG_FAULTSTAT | 0x0C)
+# Registers 0x00..0x07: config, RTD MSB/LSB, high/low fault thresholds, fault status.
+_REGISTER_COUNT = const(8)
+
+# Lookup table spacing: one entry every 2**_LUT_STEP_BITS RTD codes (1025 entries, 4 KB).
+_LUT_STEP_BITS = const(5)
+# Lookup tables already built, keyed by (rtd_nominal, ref_resistor, step_bits).
+_luts = {}
+
+
+def _cvd_temperature(raw_reading, rtd_nominal):
+    # Callendar-Van Dusen conversion of a resistance in Ohms to degrees Celsius.
+    Z1 = -_RTD_A
+    Z2 = _RTD_A * _RTD_A - (4 * _RTD_B)
+    Z3 = (4 * _RTD_B) / rtd_nominal
+    Z4 = 2 * _RTD_B
+    temp = Z2 + (Z3 * raw_reading)
+    temp = (math.sqrt(temp) + Z1) / Z4
+    if temp >= 0:
+        return temp
+    # Have to normalize to 100 ohms if temperature is less than 0C for the following math to work
+    raw_reading /= rtd_nominal
+    raw_reading *= 100
+    rpoly = raw_reading
+    temp = -242.02
+    temp += 2.2228 * rpoly
+    rpoly *= raw_reading  # square
+    temp += 2.5859e-3 * rpoly
+    rpoly *= raw_reading  # ^3
+    temp -= 4.8260e-6 * rpoly
+    rpoly *= raw_reading  # ^4
+    temp -= 2.8183e-8 * rpoly
+    rpoly *= raw_reading  # ^5
+    temp += 1.5243e-10 * rpoly
+    return temp
+
+
+def build_lut(rtd_nominal, ref_resistor, step_bits=_LUT_STEP_BITS):
+    """Return an array of centi-degrees for every 2**step_bits-th 15-bit RTD code.
+
+    The table has (32768 >> step_bits) + 1 entries, so the last code still has an
+    upper neighbour to interpolate towards. Tables are cached and shared by every
+    sensor with the same rtd_nominal/ref_resistor.
+    """
+    key = (rtd_nominal, ref_resistor, step_bits)
+    lut = _luts.get(key)
+    if lut is None:
+        step = 1 << step_bits
+        lut = array('i', (round(_cvd_temperature(code * ref_resistor / 32768, rtd_nominal) * 100)
+                          for code in range(0, 32768 + step, step)))
+        _luts[key] = lut
+    return lut
+
 class MAX31865:
     """Driver for the MAX31865 thermocouple amplifier."""
 
-    def __init__(self, spi, cs, *, rtd_nominal=100, ref_resistor=430.0, wires=2):
+    def __init__(self, spi, cs, *, rtd_nominal=100, ref_resistor=430.0, wires=2, lookup_table=False):
         self.rtd_nominal = rtd_nominal
         self.ref_resistor = ref_resistor
+        # Optional RTD code -> centi-degree table for integer-only conversion.
+        self._lut = build_lut(rtd_nominal, ref_resistor) if lookup_table else None
         self._device = spi_device.SPIDevice(spi, cs)
+        # Command/response buffers reused by every transfer: address byte + up to 8 registers.
+        self._tx = bytearray(1 + _REGISTER_COUNT)
+        self._rx = bytearray(1 + _REGISTER_COUNT)
+        self._tx2 = memoryview(self._tx)[:2]
+        self._rx2 = memoryview(self._rx)[:2]
+        self._tx3 = memoryview(self._tx)[:3]
+        self._rx3 = memoryview(self._rx)[:3]
+        self.registers = memoryview(self._rx)[1:]  # Registers 0x00..0x07 from the last burst read
+        self.fault_status = 0  # Raw fault status byte from the last burst read
         # Set wire config register based on the number of wires specified.
         if wires not in (2, 3, 4):
             raise ValueError('Wires must be a value of 2, 3, or 4!')
@@ -47,32 +122,58 @@ class MAX31865:
         else:
             # 2 or 4 wire
             config &= ~_MAX31865_CONFIG_3WIRE
-        self._write_u8(_MAX31865_CONFIG_REG, config)
+        self._write_config(config)
         # Default to no bias and no auto conversion.
+        self.continuous = False
+        self._ready_ms = 0
         self.set_bias(False)
         self.set_auto_convert(False)
 
     def _read_u8(self, address):
         # Read an 8-bit unsigned value from the specified 8-bit address.
+        self._tx[0] = address & 0x7F
+        self._tx[1] = 0
         with self._device as device:
-            device.write(bytes([address & 0x7F]))
-            buf = device.read(1)
-        return buf[0]
+            device.write_readinto(self._tx2, self._rx2)
+        return self._rx[1]
 
     def _read_u16(self, address):
         # Read a 16-bit BE unsigned value from the specified 8-bit address.
+        self._tx[0] = address & 0x7F
+        self._tx[1] = 0
+        self._tx[2] = 0
         with self._device as device:
-            device.write(bytes([address & 0x7F]))
-            buf = device.read(2)
-        return (buf[0] << 8) | buf[1]
+            device.write_readinto(self._tx3, self._rx3)
+        return (self._rx[1] << 8) | self._rx[2]
 
     def _write_u8(self, address, val):
         # Write an 8-bit unsigned value to the specified 8-bit address.
+        self._tx[0] = (address | 0x80) & 0xFF
+        self._tx[1] = val & 0xFF
         with self._device as device:
-            buf = bytearray(2)
-            buf[0] = (address | 0x80) & 0xFF
-            buf[1] = val & 0xFF
-            device.write(buf)
+            device.write(self._tx2)
+
+    def _write_config(self, config):
+        # Write the config register and remember it, minus the bits that clear themselves,
+        # so later changes do not need to read it back first.
+        self._write_u8(_MAX31865_CONFIG_REG, config)
+        self._config = config & ~_CONFIG_SELF_CLEARING & 0xFF
+
+    def read_registers(self):
+        """Read registers 0x00..0x07 (config, RTD, fault thresholds, fault status) in one transaction.
+
+        The result is left in `registers` and the fault status byte in
+        `fault_status`. Returns the raw 16-bit RTD register (fault bit included).
+        """
+        tx = self._tx
+        tx[0] = _MAX31865_CONFIG_REG
+        for i in range(1, len(tx)):
+            tx[i] = 0
+        with self._device as device:
+            device.write_readinto(tx, self._rx)
+        rx = self._rx
+        self.fault_status = rx[1 + _MAX31865_FAULTSTAT_REG]
+        return (rx[1 + _MAX31865_RTDMSB_REG] << 8) | rx[1 + _MAX31865_RTDLSB_REG]
 
     @property
     def bias(self):
@@ -80,12 +181,12 @@ class MAX31865:
         return bool(self._read_u8(_MAX31865_CONFIG_REG) & _MAX31865_CONFIG_BIAS)
 
     def set_bias(self, val):
-        config = self._read_u8(_MAX31865_CONFIG_REG)
+        config = self._config
         if val:
             config |= _MAX31865_CONFIG_BIAS  # Enable bias.
         else:
             config &= ~_MAX31865_CONFIG_BIAS  # Disable bias.
-        self._write_u8(_MAX31865_CONFIG_REG, config)
+        self._write_config(config)
 
     @property
     def auto_convert(self):
@@ -93,12 +194,26 @@ class MAX31865:
         return bool(self._read_u8(_MAX31865_CONFIG_REG) & _MAX31865_CONFIG_MODEAUTO)
 
     def set_auto_convert(self, val):
-        config = self._read_u8(_MAX31865_CONFIG_REG)
+        config = self._config
         if val:
             config |= _MAX31865_CONFIG_MODEAUTO  # Enable auto convert.
         else:
             config &= ~_MAX31865_CONFIG_MODEAUTO  # Disable auto convert.
-        self._write_u8(_MAX31865_CONFIG_REG, config)
+        self._write_config(config)
+
+    def set_continuous(self, val):
+        """Enable or disable continuous conversion mode.
+
+        Bias is left on and the chip converts on its own every 20 ms (50 Hz
+        filter) or 16.7 ms (60 Hz), so `read_rtd_async` and `temperature_async`
+        only have to fetch the latest result instead of waiting ~75 ms for a
+        one-shot conversion. Costs the bias current (and its slight
+        self-heating) all the time.
+        """
+        self.set_bias(val)
+        self.set_auto_convert(val)
+        self.continuous = bool(val)
+        self._ready_ms = time.ticks_add(time.ticks_ms(), _AUTO_FIRST_MS)
 
     @property
     def fault(self):
@@ -121,57 +236,165 @@ class MAX31865:
 
     def clear_faults(self):
         """Clear any fault state previously detected by the sensor."""
-        config = self._read_u8(_MAX31865_CONFIG_REG)
+        config = self._config
         config &= ~0x2C
         config |= _MAX31865_CONFIG_FAULTSTAT
-        self._write_u8(_MAX31865_CONFIG_REG, config)
+        self._write_config(config)
 
     def read_rtd(self):
         """Perform a raw reading of the thermocouple and return its 15-bit value. You'll need to manually convert this to temperature using the nominal value of the resistance-to-digital conversion and some math. If you just want temperature use the temperature property instead."""
-        self.clear_faults()
-        self.set_bias(True)
+        if self.continuous:
+            return self._read_latest_rtd()
+        self._bias_on_clear_faults()
         time.sleep(0.01)
-        config = self._read_u8(_MAX31865_CONFIG_REG)
-        config |= _MAX31865_CONFIG_1SHOT
-        self._write_u8(_MAX31865_CONFIG_REG, config)
+        self._write_config(self._config | _MAX31865_CONFIG_1SHOT)
         time.sleep(0.065)
-        rtd = self._read_u16(_MAX31865_RTDMSB_REG)
+        return self._read_latest_rtd()
+
+    async def read_rtd_async(self):
+        """Like `read_rtd`, but never blocks the event loop.
+
+        In continuous mode this is a single register read of the latest
+        conversion. Otherwise the one-shot bias settling and conversion time
+        are awaited instead of slept.
+        """
+        if self.continuous:
+            wait = time.ticks_diff(self._ready_ms, time.ticks_ms())
+            if wait > 0:
+                await asyncio.sleep_ms(wait)  # First conversion after enabling is not done yet
+            return self._read_latest_rtd()
+        self._bias_on_clear_faults()
+        await asyncio.sleep_ms(_BIAS_SETTLE_MS)
+        self._write_config(self._config | _MAX31865_CONFIG_1SHOT)
+        await asyncio.sleep_ms(_ONESHOT_MS)
+        return self._read_latest_rtd()
+
+    def _bias_on_clear_faults(self):
+        # clear_faults() and set_bias(True) folded into a single config write.
+        self._write_config((self._config & ~0x2C) | _MAX31865_CONFIG_BIAS | _MAX31865_CONFIG_FAULTSTAT)
+
+    def _read_latest_rtd(self):
+        rtd = self.read_registers()
+        if self.continuous and self.registers[_MAX31865_CONFIG_REG] & _MAX31865_CONFIG_MODEAUTO == 0:
+            # The chip lost its config (brown-out or hot-plug): restart conversions.
+            self._write_config(self._config)
+            self._ready_ms = time.ticks_add(time.ticks_ms(), _AUTO_FIRST_MS)
         # Remove fault bit.
         rtd >>= 1
         return rtd
 
+    def rtd_to_resistance(self, rtd):
+        """Convert a raw 15-bit RTD value to Ohms."""
+        resistance = rtd / 32768
+        resistance *= self.ref_resistor
+        return resistance
+
     @property
     def resistance(self):
         """Read the resistance of the RTD and return its value in Ohms."""
-        resistance = self.read_rtd()
-        resistance /= 32768
-        resistance *= self.ref_resistor
-        return resistance
+        return self.rtd_to_resistance(self.read_rtd())
 
     @property
     def temperature(self):
         """Read the temperature of the sensor and return its value in degrees Celsius."""
-        raw_reading = self.resistance
-        Z1 = -_RTD_A
-        Z2 = _RTD_A * _RTD_A - (4 * _RTD_B)
-        Z3 = (4 * _RTD_B) / self.rtd_nominal
-        Z4 = 2 * _RTD_B
-        temp = Z2 + (Z3 * raw_reading)
-        temp = (math.sqrt(temp) + Z1) / Z4
-        if temp >= 0:
-            return temp
-        # Have to normalize to 100 ohms if temperature is less than 0C for the following math to work
-        raw_reading /= self.rtd_nominal
-        raw_reading *= 100
-        rpoly = raw_reading
-        temp = -242.02
-        temp += 2.2228 * rpoly
-        rpoly *= raw_reading  # square
-        temp += 2.5859e-3 * rpoly
-        rpoly *= raw_reading  # ^3
-        temp -= 4.8260e-6 * rpoly
-        rpoly *= raw_reading  # ^4
-        temp -= 2.8183e-8 * rpoly
-        rpoly *= raw_reading  # ^5
-        temp += 1.5243e-10 * rpoly
-        return temp
\ No newline at end of file
+        return self.rtd_to_temperature(self.read_rtd())
+
+    async def temperature_async(self):
+        """Read the temperature in degrees Celsius without blocking the event loop."""
+        return self.rtd_to_temperature(await self.read_rtd_async())
+
+    def rtd_to_temperature(self, rtd):
+        """Convert a raw 15-bit RTD value to degrees Celsius, through the lookup table if enabled."""
+        if self._lut is not None:
+            return self.rtd_to_centidegrees(rtd) / 100
+        return self.resistance_to_temperature(self.rtd_to_resistance(rtd))
+
+    def rtd_to_centidegrees(self, rtd):
+        """Convert a raw 15-bit RTD value to hundredths of a degree Celsius.
+
+        With the lookup table this is integer arithmetic only and does not
+        allocate; without it, it falls back to the floating-point formula.
+        """
+        lut = self._lut
+        if lut is None:
+            return round(self.rtd_to_temperature(rtd) * 100)
+        bits = _LUT_STEP_BITS
+        index = rtd >> bits
+        frac = rtd & ((1 << bits) - 1)
+        low = lut[index]
+        return low + (((lut[index + 1] - low) * frac + (1 << (bits - 1))) >> bits)
+
+    def resistance_to_temperature(self, raw_reading):
+        """Convert an RTD resistance in Ohms to degrees Celsius (Callendar-Van Dusen)."""
+        return _cvd_temperature(raw_reading, self.rtd_nominal)
+
+
+class RTDScanner:
+    """Reads several MAX31865 chips that share one SPI bus.
+
+    Conversions on all chips run in parallel: every one-shot chip is biased,
+    then triggered, and the settle and conversion times are awaited once for
+    the whole set, so N channels take about as long as one. Chips in
+    continuous mode are simply read. Their fault status latches, so a fault
+    there is cleared and the channel read again after the next conversion;
+    only a fault that is still set then is reported, and a transient one
+    (an EMI spike on the leads) costs one conversion period. Results stay in
+    `rtd` (15-bit codes) and `faults` (fault status byte, 0xFF if the chip
+    could not be read).
+    """
+
+    def __init__(self, sensors):
+        self.sensors = sensors
+        self.rtd = array('H', [0] * len(sensors))
+        self.faults = bytearray(len(sensors))
+
+    async def scan(self):
+        sensors = self.sensors
+        oneshot = False
+        for sensor in sensors:
+            if not sensor.continuous:
+                sensor._bias_on_clear_faults()
+                oneshot = True
+        if oneshot:
+            await asyncio.sleep_ms(_BIAS_SETTLE_MS)
+            for sensor in sensors:
+                if not sensor.continuous:
+                    sensor._write_config(sensor._config | _MAX31865_CONFIG_1SHOT)
+            await asyncio.sleep_ms(_ONESHOT_MS)
+        latched = False
+        for i in range(len(sensors)):
+            sensor = sensors[i]
+            if sensor.continuous:
+                wait = time.ticks_diff(sensor._ready_ms, time.ticks_ms())
+                if wait > 0:
+                    await asyncio.sleep_ms(wait)
+            self._read(i)
+            if sensor.continuous and self.faults[i] and self.faults[i] != 0xFF:
+                sensor._write_config(sensor._config | _MAX31865_CONFIG_FAULTSTAT)
+                latched = True
+        if latched:
+            await asyncio.sleep_ms(_AUTO_PERIOD_MS)
+            for i in range(len(sensors)):
+                if sensors[i].continuous and self.faults[i] and self.faults[i] != 0xFF:
+                    self._read(i)
+
+    def _read(self, i):
+        try:
+            self.rtd[i] = self.sensors[i]._read_latest_rtd()
+            self.faults[i] = self.sensors[i].fault_status
+        except Exception as e:
+            print(f"Error reading RTD channel {i}: {e}")
+            self.rtd[i] = 0
+            self.faults[i] = 0xFF
+
+    def temperature(self, channel):
+        """Temperature of a channel from the last scan in degrees Celsius, or None if it is faulted."""
+        if self.faults[channel]:
+            return None
+        return self.sensors[channel].rtd_to_temperature(self.rtd[channel])
+
+    def centidegrees(self, channel):
+        """Temperature of a channel from the last scan in hundredths of a degree, or None if it is faulted."""
+        if self.faults[channel]:
+            return None
+        return self.sensors[channel].rtd_to_centidegrees(self.rtd[channel])
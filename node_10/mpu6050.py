@@ -0,0 +1,160 @@
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+# Register and other constant values:
+MPU6050_ADDR = 0x68  # Default I2C address (AD0 low)
+SMPLRT_DIV = 0x19  # Sample rate = gyro output rate / (1 + SMPLRT_DIV)
+CONFIG = 0x1A  # DLPF_CFG in bits 2:0
+FIFO_EN = 0x23  # Selects which sensors are written to the FIFO
+INT_STATUS = 0x3A  # FIFO_OFLOW_INT in bit 4, cleared on read
+ACCEL_XOUT_H = 0x3B  # First of the six accelerometer data registers
+USER_CTRL = 0x6A  # FIFO enable / reset
+PWR_MGMT_1 = 0x6B  # Power management register
+FIFO_COUNTH = 0x72  # FIFO byte count, big-endian 16-bit
+FIFO_R_W = 0x74  # FIFO data port
+WHO_AM_I = 0x75  # Identity register, reads back 0x68
+
+FIFO_EN_ACCEL = 0x08
+USER_CTRL_FIFO_EN = 0x40
+USER_CTRL_FIFO_RESET = 0x04
+INT_STATUS_FIFO_OFLOW = 0x10
+
+FIFO_SIZE = 1024  # Bytes of FIFO on the chip
+FRAME_BYTES = 6  # One accelerometer sample (X, Y, Z as big-endian int16)
+ACCEL_LSB_PER_G = 16384.0  # Sensitivity at the default +/-2 g range
+# Accelerometer bandwidth in Hz for each DLPF_CFG (datasheet table; 7 is reserved, treated as 0).
+ACCEL_BANDWIDTH_HZ = (260, 184, 94, 44, 21, 10, 5, 260)
+
+
+def unpack_frame(buf, index):
+    """Return the signed raw (x, y, z) counts of sample number index in a FIFO buffer."""
+    return struct.unpack_from(">hhh", buf, index * FRAME_BYTES)
+
+
+class MPU6050:
+    """Minimal MPU6050 accelerometer driver.
+
+    All three axes are fetched with one burst read of ACCEL_XOUT_H..ACCEL_ZOUT_L
+    into a buffer that is allocated once, so the sampling loop does a single I2C
+    transaction per sample and does not churn the heap. For a deterministic
+    sample rate, configure_fifo() lets the chip sample into its 1 KB FIFO and
+    read_fifo_into() drains it in bulk, or read_window() collects a whole
+    analysis window from it.
+    """
+
+    def __init__(self, i2c, address=MPU6050_ADDR):
+        self.i2c = i2c
+        self.address = address
+        self._accel_buf = bytearray(6)
+        self._reg_buf = bytearray(2)
+        self.sample_rate = 0  # Actual FIFO sample rate in Hz, 0 while the FIFO is off
+        self.bandwidth_hz = ACCEL_BANDWIDTH_HZ[0]  # Accelerometer -3 dB bandwidth set by the DLPF (off at reset)
+        self.fifo_overflows = 0
+
+    def detect(self):
+        """Return True if a device answering as an MPU6050 is on the bus."""
+        return self.i2c.readfrom_mem(self.address, WHO_AM_I, 1)[0] == 0x68
+
+    def wake(self):
+        """Take the sensor out of sleep mode (it powers up asleep)."""
+        self.i2c.writeto_mem(self.address, PWR_MGMT_1, b'\x00')
+
+    def read_accel_raw(self):
+        """Burst-read the three accelerometer axes and return signed raw counts (x, y, z)."""
+        self.i2c.readfrom_mem_into(self.address, ACCEL_XOUT_H, self._accel_buf)
+        return struct.unpack_from(">hhh", self._accel_buf)
+
+    def _write_reg(self, register, value):
+        self._reg_buf[0] = value
+        self.i2c.writeto_mem(self.address, register, memoryview(self._reg_buf)[:1])
+
+    def _read_reg(self, register):
+        buf = memoryview(self._reg_buf)[:1]
+        self.i2c.readfrom_mem_into(self.address, register, buf)
+        return self._reg_buf[0]
+
+    def configure_fifo(self, rate_hz=1000, dlpf_cfg=1):
+        """Sample the accelerometer into the hardware FIFO at a fixed rate.
+
+        The gyro output clock is 8 kHz with the DLPF off (DLPF_CFG 0 or 7) and
+        1 kHz otherwise; the accelerometer itself never updates faster than
+        1 kHz. The DLPF also limits the accelerometer bandwidth, to
+        ACCEL_BANDWIDTH_HZ[dlpf_cfg] (184 Hz by default), which is kept in
+        bandwidth_hz. Returns the sample rate actually programmed.
+        """
+        base = 8000 if dlpf_cfg in (0, 7) else 1000
+        divider = max(0, min(255, base // rate_hz - 1))
+        self._write_reg(CONFIG, dlpf_cfg & 0x07)
+        self._write_reg(SMPLRT_DIV, divider)
+        self._write_reg(FIFO_EN, FIFO_EN_ACCEL)
+        self.sample_rate = base // (divider + 1)
+        self.bandwidth_hz = ACCEL_BANDWIDTH_HZ[dlpf_cfg & 0x07]
+        self.reset_fifo()
+        return self.sample_rate
+
+    def disable_fifo(self):
+        self._write_reg(FIFO_EN, 0)
+        self._write_reg(USER_CTRL, 0)
+        self.sample_rate = 0
+
+    def reset_fifo(self):
+        """Discard everything queued in the FIFO and restart it."""
+        self._write_reg(USER_CTRL, USER_CTRL_FIFO_RESET)
+        self._write_reg(USER_CTRL, USER_CTRL_FIFO_EN)
+        self._read_reg(INT_STATUS)  # Clear a stale overflow flag
+
+    def fifo_count(self):
+        """Return the number of bytes waiting in the FIFO."""
+        self.i2c.readfrom_mem_into(self.address, FIFO_COUNTH, self._reg_buf)
+        return (self._reg_buf[0] << 8) | self._reg_buf[1]
+
+    def read_fifo_into(self, buf, max_samples):
+        """Drain whole samples from the FIFO into buf and return how many were read.
+
+        buf must hold at least FRAME_BYTES per sample; samples are packed back to
+        back as big-endian int16 X, Y, Z. Reads never split a frame. If the FIFO
+        overflowed, it is reset, fifo_overflows is bumped and 0 is returned, as
+        the frame alignment of whatever is left can no longer be trusted.
+        """
+        if self._read_reg(INT_STATUS) & INT_STATUS_FIFO_OFLOW:
+            self.fifo_overflows += 1
+            self.reset_fifo()
+            return 0
+        samples = min(self.fifo_count() // FRAME_BYTES, max_samples, len(buf) // FRAME_BYTES)
+        if samples:
+            self.i2c.readfrom_mem_into(self.address, FIFO_R_W, memoryview(buf)[:samples * FRAME_BYTES])
+        return samples
+
+    async def read_window(self, buf, num_samples, consumer, offsets=(0, 0, 0), drain_ms=20):
+        """Feed num_samples contiguous FIFO samples, in g with offsets removed, to consumer(ax, ay, az).
+
+        The FIFO is reset first and drained through buf every drain_ms, so
+        other tasks run in between. Returns True once the window is complete,
+        or False as soon as the FIFO overflows: the samples already fed are
+        then followed by a gap, so the caller must discard them and start over.
+        """
+        ax_offset, ay_offset, az_offset = offsets
+        chunk = len(buf) // FRAME_BYTES
+        overflows = self.fifo_overflows
+        self.reset_fifo()  # Start the window with fresh, contiguous samples
+        remaining = num_samples
+        while remaining:
+            n = self.read_fifo_into(buf, remaining)
+            if self.fifo_overflows != overflows:
+                return False
+            for i in range(n):
+                ax, ay, az = unpack_frame(buf, i)
+                consumer((ax - ax_offset) / ACCEL_LSB_PER_G, (ay - ay_offset) / ACCEL_LSB_PER_G,
+                         (az - az_offset) / ACCEL_LSB_PER_G)
+            remaining -= n
+            if n == chunk:
+                await asyncio.sleep(0)  # Chunk was full, more is probably queued already
+            elif remaining:
+                await asyncio.sleep_ms(drain_ms)  # Let the FIFO refill while other tasks run
+        return True
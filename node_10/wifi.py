@@ -0,0 +1,130 @@
+import json
+import network
+import time
+
+CACHE_FILE = "wifi.json"  # {"bssid": hex, "channel": n, "ifconfig": [ip, mask, gateway, dns] (optional)}
+DIRECTED_TIMEOUT_MS = 5000  # A directed association that takes longer than this falls back to the SSID
+
+
+def load():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store(cache):
+    try:
+        with open(CACHE_FILE, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"Failed to write {CACHE_FILE}: {e}")
+
+
+def remember(target):
+    """Save the (bssid, channel) of a successful association, keeping any static IP config."""
+    cache = load()
+    bssid = target[0].hex()
+    if cache.get("bssid") == bssid and cache.get("channel") == target[1]:
+        return
+    cache["bssid"] = bssid
+    cache["channel"] = target[1]
+    _store(cache)
+
+
+def scan(wlan, ssid):
+    """Return (bssid, channel) of the strongest access point for ssid, or None. Blocks for the scan."""
+    wlan.active(True)
+    best = None
+    for net in wlan.scan():  # (ssid, bssid, channel, RSSI, security, hidden)
+        if net[0] == ssid.encode() and (best is None or net[3] > best[3]):
+            best = net
+    return (best[1], best[2]) if best is not None else None
+
+
+def forget():
+    """Drop the cached access point, e.g. after a directed association failed."""
+    cache = load()
+    if cache.pop("bssid", None) is not None:
+        cache.pop("channel", None)
+        _store(cache)
+
+
+def set_static_ip(ifconfig):
+    """Use a fixed (ip, mask, gateway, dns) from now on instead of DHCP; None goes back to DHCP."""
+    cache = load()
+    if ifconfig is None:
+        cache.pop("ifconfig", None)
+    else:
+        cache["ifconfig"] = list(ifconfig)
+    _store(cache)
+
+
+def start(wlan, ssid, password, directed=True, target=None):
+    """Start associating with ssid and return the (bssid, channel) targeted, or None.
+
+    The station connects straight to target, or with directed set to the
+    access point cached by an earlier connect(), on its channel. Otherwise it
+    associates by SSID, leaving the choice of access point to the driver.
+    There is no scan, so this is safe to call from the event loop while
+    sampling runs. A static IP in the cache replaces DHCP. Does not wait for
+    the connection.
+    """
+    wlan.active(True)
+    try:
+        wlan.disconnect()  # Drop a stale association attempt before starting a new one
+    except OSError:
+        pass
+    cache = load()
+    if "ifconfig" in cache:
+        wlan.ifconfig(tuple(cache["ifconfig"]))
+    if target is None and directed and "bssid" in cache:
+        target = (bytes.fromhex(cache["bssid"]), cache["channel"])
+    if target is None:
+        wlan.connect(ssid, password)
+        return None
+    try:
+        wlan.config(channel=target[1])  # Not every port accepts a channel hint for the station
+    except (OSError, ValueError, TypeError):
+        pass
+    wlan.connect(ssid, password, bssid=target[0])
+    return target
+
+
+def connect(wlan, ssid, password, timeout_ms=20000):
+    """Blocking connect for boot.py, before sampling starts. Returns True once connected.
+
+    The cached access point is tried first. Without one, or if it does not
+    answer, a single scan picks the strongest access point for ssid, and it
+    is cached once the association succeeds, so every later connect (the
+    link supervisor's included) goes out directed without scanning.
+    """
+    if "bssid" in load():
+        start(wlan, ssid, password)
+        if wait(wlan, DIRECTED_TIMEOUT_MS):
+            return True
+        print("Cached access point did not answer, scanning...")
+        forget()
+    target = scan(wlan, ssid)
+    start(wlan, ssid, password, target=target)
+    if wait(wlan, timeout_ms):
+        if target is not None:
+            remember(target)
+        return True
+    wlan.disconnect()
+    return False
+
+
+def failed(wlan):
+    """True once the association has definitely failed (wrong password, access point not found)."""
+    return wlan.status() in (network.STAT_WRONG_PASSWORD, network.STAT_NO_AP_FOUND)
+
+
+def wait(wlan, timeout_ms):
+    start_ms = time.ticks_ms()
+    while not wlan.isconnected():
+        if failed(wlan) or time.ticks_diff(time.ticks_ms(), start_ms) > timeout_ms:
+            return False
+        time.sleep_ms(50)
+    return True
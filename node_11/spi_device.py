@@ -3,6 +3,46 @@
 SPI Bus Device
 ====================================================
 """
+
+# ESP32 SPI peripherals and the pins they reach without the GPIO matrix: (sck, mosi, miso).
+HARDWARE_SPI_PINS = {
+    1: (14, 13, 12),  # HSPI
+    2: (18, 23, 19),  # VSPI
+}
+
+
+def open_spi(sck, mosi, miso, *, backend="auto", baudrate=1000000, soft_baudrate=50000, polarity=0, phase=0):
+    """
+    Create the SPI bus for a set of pin numbers.
+    :param str backend: "hard" for a hardware SPI peripheral, "soft" for bit-banged SoftSPI, or
+        "auto" to use hardware SPI when the pins are a peripheral's native pins and fall back
+        to SoftSPI otherwise.
+    :param int baudrate: Clock for hardware SPI.
+    :param int soft_baudrate: Clock for SoftSPI.
+    Returns a machine.SPI or machine.SoftSPI; both work with SPIDevice.
+    """
+    import machine
+    if backend not in ("auto", "hard", "soft"):
+        raise ValueError("SPI backend must be 'auto', 'hard' or 'soft'!")
+    if backend != "soft":
+        for spi_id, pins in HARDWARE_SPI_PINS.items():
+            if pins != (sck, mosi, miso):
+                continue
+            try:
+                return machine.SPI(spi_id, baudrate=baudrate, polarity=polarity, phase=phase,
+                                   sck=machine.Pin(sck), mosi=machine.Pin(mosi), miso=machine.Pin(miso))
+            except (OSError, ValueError) as e:
+                if backend == "hard":
+                    raise
+                print(f"Hardware SPI {spi_id} unavailable ({e}), using SoftSPI.")
+            break
+        else:
+            if backend == "hard":
+                raise ValueError("SPI pins do not map to a hardware SPI peripheral!")
+    return machine.SoftSPI(baudrate=soft_baudrate, polarity=polarity, phase=phase,
+                           sck=machine.Pin(sck, machine.Pin.OUT), mosi=machine.Pin(mosi, machine.Pin.OUT),
+                           miso=machine.Pin(miso, machine.Pin.IN))
+
 class SPIDevice:
     """
     Represents a single SPI device and manages locking the bus and the device
@@ -40,6 +80,9 @@ class SPIDevice:
         self.polarity = polarity
         self.phase = phase
         self.extra_clocks = extra_clocks
+        # Preallocated so __exit__ does not touch the heap.
+        self._clock_buf = bytearray(b'\xff')
+        self._clock_bytes = (extra_clocks + 7) // 8
 
     def __enter__(self):
         # Locking has been disabled (for now) as MicroPython SPI object does not support it
@@ -51,14 +94,8 @@ class SPIDevice:
 
     def __exit__(self, *exc):
         self.chip_select.value(1)
-        if self.extra_clocks > 0:
-            buf = bytearray(1)
-            buf[0] = 0xff
-            clocks = self.extra_clocks // 8
-            if self.extra_clocks % 8 != 0:
-                clocks += 1
-            for _ in range(clocks):
-                self.spi.write(buf)
+        for _ in range(self._clock_bytes):
+            self.spi.write(self._clock_buf)
         # Locking has been disabled (for now) as MicroPython SPI object does not support it
         # self.spi.unlock()
         return False
\ No newline at end of file
@@ -0,0 +1,159 @@
+import os
+try:
+    import hashlib
+except ImportError:
+    import uhashlib as hashlib
+
+BLOCK = 512  # Tar header and data block size
+GZIP_WBITS = 12  # Deflate window of compressed bundles (4 KB); tools/pack_firmware.py must not use a larger one
+
+
+def _read_exact(src, view, n):
+    """Fill view[:n] from src, which may return short reads. Returns the bytes read, < n only at EOF."""
+    got = 0
+    while got < n:
+        r = src.readinto(view[got:n])
+        if not r:
+            break
+        got += r
+    return got
+
+
+def _skip(src, view, n):
+    while n:
+        step = min(n, len(view))
+        if _read_exact(src, view, step) != step:
+            raise ValueError("Unexpected end of tar stream")
+        n -= step
+
+
+def _octal(field):
+    field = bytes(field).strip(b"\0 ")
+    return int(field, 8) if field else 0
+
+
+def makedirs(path):
+    """Create path and any missing parents (MicroPython's os has no makedirs)."""
+    current = "/" if path.startswith("/") else ""
+    for part in path.split("/"):
+        if not part:
+            continue
+        current = current + part if current in ("", "/") else current + "/" + part
+        try:
+            os.mkdir(current)
+        except OSError:
+            pass  # Already exists
+
+
+def remove_tree(path):
+    """Delete path and everything below it; a missing path is not an error."""
+    try:
+        entries = list(os.ilistdir(path))
+    except OSError:
+        return
+    for entry in entries:
+        child = path + "/" + entry[0]
+        if entry[1] == 0x4000:  # Directory
+            remove_tree(child)
+        else:
+            os.remove(child)
+    os.rmdir(path)
+
+
+def member_name(header):
+    """Return the member path stored in a tar header, relative and without a leading "./"."""
+    name = bytes(header[0:100]).split(b"\0", 1)[0].decode()
+    if bytes(header[257:262]) == b"ustar":
+        prefix = bytes(header[345:500]).split(b"\0", 1)[0].decode()
+        if prefix:
+            name = prefix + "/" + name
+    while name.startswith("./"):
+        name = name[2:]
+    return name.rstrip("/")
+
+
+def extract(src, dest, buf, hashes=None):
+    """Extract a tar stream into the directory dest in a single pass.
+
+    src is anything with readinto() (a socket, a file, a decompressor). Each
+    header is read straight off the stream, its checksum checked, and a
+    regular file is copied to dest through buf, so memory use does not depend
+    on member size and nothing but the extracted files touches flash. buf
+    must be at least BLOCK bytes. Directories are created, other member
+    types (links, pax headers) are skipped. Returns [(name, size)] of the
+    extracted files. Raises ValueError on a truncated or corrupt stream
+    (including one missing the end-of-archive block) or on a member path
+    that would land outside dest. If hashes is a dict, the SHA-256 digest of
+    every extracted file is stored in it by name, computed on the same pass.
+    """
+    view = memoryview(buf)
+    header = view[:BLOCK]
+    members = []
+    while True:
+        got = _read_exact(src, header, BLOCK)
+        if got == BLOCK and not any(header):
+            break  # The zero block that ends the archive
+        if got != BLOCK:
+            raise ValueError("Unexpected end of tar stream")
+        stored = _octal(header[148:156])
+        total = 256  # The checksum field counts as eight spaces
+        for i in range(148):
+            total += header[i]
+        for i in range(156, BLOCK):
+            total += header[i]
+        if total != stored:
+            raise ValueError("Corrupt tar header")
+        name = member_name(header)
+        size = _octal(header[124:136])
+        kind = header[156]
+        padding = -size % BLOCK
+        if name.startswith("/") or ".." in name.split("/"):
+            raise ValueError(f"Unsafe path in tar: {name}")
+        if kind in (0, 0x30) and name:  # Regular file ("0", or NUL in old archives)
+            path = dest + "/" + name
+            if "/" in name:
+                makedirs(path[:path.rfind("/")])
+            remaining = size
+            digest = hashlib.sha256() if hashes is not None else None
+            with open(path, "wb") as f:
+                while remaining:
+                    step = min(remaining, len(view))
+                    if _read_exact(src, view, step) != step:
+                        raise ValueError(f"Unexpected end of tar stream in {name}")
+                    f.write(view[:step])
+                    if digest is not None:
+                        digest.update(view[:step])
+                    remaining -= step
+            if digest is not None:
+                hashes[name] = digest.digest()
+            members.append((name, size))
+            _skip(src, view, padding)
+        else:
+            if kind == 0x35 and name:  # Directory
+                makedirs(dest + "/" + name)
+            _skip(src, view, size + padding)
+    return members
+
+
+def gunzip(src):
+    """Wrap a gzip stream so readinto() returns its decompressed bytes, with a 2**GZIP_WBITS byte window."""
+    try:
+        import deflate  # MicroPython 1.21+
+        return deflate.DeflateIO(src, deflate.GZIP, GZIP_WBITS)
+    except ImportError:
+        try:
+            import zlib
+        except ImportError:
+            import uzlib as zlib
+        return zlib.DecompIO(src, 16 + GZIP_WBITS)
+
+
+def drain(src, buf):
+    """Read src to the end, e.g. so a decompressor checks the gzip CRC. Returns the bytes skipped."""
+    view = memoryview(buf)
+    total = 0
+    while True:
+        n = src.readinto(view)
+        if not n:
+            return total
+        total += n
@@ -0,0 +1,89 @@
+import json
+try:
+    import hashlib
+except ImportError:
+    import uhashlib as hashlib
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+
+# Firmware bundle manifest, the first member of every bundle (tools/pack_firmware.py writes it):
+#   {"version": n, "files": {"main.py": {"size": n, "sha256": hex}, ...}}
+# With a key, manifest.sig follows it and holds the hex HMAC-SHA256 of the manifest bytes.
+MANIFEST = "manifest.json"
+SIGNATURE = "manifest.sig"
+KEY_FILE = "/ota.key"  # Shared signing key; when present, unsigned bundles are rejected
+
+
+def hmac_sha256(key, msg):
+    """HMAC-SHA256 (RFC 2104), MicroPython has no hmac module."""
+    if len(key) > 64:
+        key = hashlib.sha256(key).digest()
+    key = key + bytes(64 - len(key))
+    inner = hashlib.sha256(bytes(b ^ 0x36 for b in key))
+    inner.update(msg)
+    outer = hashlib.sha256(bytes(b ^ 0x5C for b in key))
+    outer.update(inner.digest())
+    return outer.digest()
+
+
+def _equal(a, b):
+    # Compares every byte, so the time taken does not reveal where a forged value differs.
+    if len(a) != len(b):
+        return False
+    diff = 0
+    for x, y in zip(a, b):
+        diff |= x ^ y
+    return diff == 0
+
+
+def _load_key():
+    try:
+        with open(KEY_FILE, "rb") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def verify(staging_dir, staged, hashes, version):
+    """Check an extracted bundle against its manifest and return the files to install.
+
+    staged and hashes come from tarstream.extract(), whose SHA-256 of every
+    member was taken while it streamed past, so nothing is read back from
+    flash here apart from the manifest itself. Every file listed must be
+    present with its size and hash, nothing unlisted may be present, and the
+    manifest must be for version. If KEY_FILE exists the manifest must carry
+    a valid signature. Raises ValueError naming the first problem found.
+    """
+    sizes = dict(staged)
+    if MANIFEST not in sizes:
+        raise ValueError("bundle has no manifest")
+    with open(f"{staging_dir}/{MANIFEST}", "rb") as f:
+        raw = f.read()
+    key = _load_key()
+    if key:
+        if SIGNATURE not in sizes:
+            raise ValueError("bundle is not signed")
+        with open(f"{staging_dir}/{SIGNATURE}", "rb") as f:
+            signature = f.read().strip()
+        if not _equal(binascii.hexlify(hmac_sha256(key, raw)), signature):
+            raise ValueError("bad manifest signature")
+    manifest = json.loads(raw)
+    if manifest.get("version") != version:
+        raise ValueError(f"manifest is for version {manifest.get('version')}, expected {version}")
+    files = manifest["files"]
+    for name, size in staged:
+        if name in (MANIFEST, SIGNATURE):
+            continue
+        entry = files.get(name)
+        if entry is None:
+            raise ValueError(f"{name} is not in the manifest")
+        if entry["size"] != size:
+            raise ValueError(f"{name} is {size} bytes, manifest says {entry['size']}")
+        if not _equal(binascii.hexlify(hashes[name]), entry["sha256"].encode()):
+            raise ValueError(f"{name} does not match its SHA-256")
+    for name in files:
+        if name not in sizes:
+            raise ValueError(f"{name} is missing from the bundle")
+    return [(name, size) for name, size in staged if name not in (MANIFEST, SIGNATURE)]
@@ -0,0 +1,142 @@
+import network
+import random
+import time
+import uasyncio as asyncio
+import wifi
+try:
+    import errno
+except ImportError:
+    import uerrno as errno
+from umqttsimple import MQTTException
+
+# Failure classes returned by classify()
+LINK = "link"  # The MQTT connection dropped: reconnect to the broker
+NETWORK = "network"  # No route to the broker: Wi-Fi or the AP is the problem
+BROKER = "broker"  # The broker is reachable but refused or rejected us
+
+_LINK_ERRNOS = (errno.ECONNRESET, errno.ECONNABORTED, errno.ENOTCONN, errno.ETIMEDOUT, errno.EIO)
+
+
+def classify(exc):
+    """Return LINK, NETWORK or BROKER for an exception from network I/O, None if it is not a link failure."""
+    if isinstance(exc, MQTTException):
+        return BROKER
+    if isinstance(exc, OSError):
+        code = exc.args[0] if exc.args else None
+        if code == -1 or code in _LINK_ERRNOS:  # umqtt raises OSError(-1) for a lost connection
+            return LINK
+        if code == errno.EHOSTUNREACH:
+            return NETWORK
+        if code == errno.ECONNREFUSED:
+            return BROKER
+    if isinstance(exc, asyncio.TimeoutError):
+        return LINK
+    return None
+
+
+class LinkSupervisor:
+    """Keeps Wi-Fi and the MQTT connection up, from a single task.
+
+    run() associates with the AP without blocking the event loop, then calls
+    connect_mqtt (a coroutine returning a connected client, or raising). After
+    each failed attempt it waits a random time between 0 and
+    base_delay * 2**attempts, capped at max_delay ("full jitter"), so nodes
+    that lost the link together, e.g. after a power blip, spread their
+    retries instead of hitting the AP and broker in lockstep. Code that hits
+    an I/O error hands it to report(), which marks the link down and wakes
+    the supervisor instead of reconnecting on its own.
+    """
+
+    def __init__(self, ssid, password, connect_mqtt, base_delay=1, max_delay=300, wifi_timeout=20, poll_interval=5):
+        self.ssid = ssid
+        self.password = password
+        self.connect_mqtt = connect_mqtt
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.wifi_timeout = wifi_timeout
+        self.poll_interval = poll_interval
+        self.wlan = network.WLAN(network.STA_IF)
+        self.client = None
+        self.attempts = 0  # Consecutive failed attempts, drives the backoff
+        self._stale = True
+        self._wake = asyncio.Event()
+
+    @property
+    def wifi_up(self):
+        return self.wlan.isconnected()
+
+    @property
+    def up(self):
+        """True while Wi-Fi and the MQTT connection are both usable."""
+        return not self._stale and self.client is not None and self.client.connected and self.wlan.isconnected()
+
+    def report(self, exc):
+        """Record a failed network operation. Returns its class, or None if it was not a link failure."""
+        kind = classify(exc)
+        if kind is not None:
+            if not self._stale:
+                print(f"Link down ({kind}): {exc}")
+            self._stale = True
+            self._wake.set()
+        return kind
+
+    async def run(self):
+        while True:
+            if self.up:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._backoff()
+            try:
+                await self._attempt()
+                self.attempts = 0
+            except Exception as e:
+                self.attempts += 1
+                print(f"Link attempt {self.attempts} failed ({classify(e) or 'error'}): {e}")
+
+    async def _backoff(self):
+        # Full jitter, even on the first attempt, to break up synchronized restarts.
+        cap = min(self.max_delay, self.base_delay * (1 << min(self.attempts, 16)))
+        await asyncio.sleep_ms(int(cap * 1000) * random.getrandbits(16) >> 16)
+
+    async def _attempt(self):
+        if not self.wlan.isconnected():
+            await self._connect_wifi()
+        self.client = await self.connect_mqtt()
+        self._stale = False
+
+    async def _connect_wifi(self):
+        # Directed association to the access point boot.py cached (wifi.connect), by SSID if that fails.
+        # Never scans: a blocking scan here would stall the event loop and overflow the MPU FIFO.
+        wlan = self.wlan
+        start = time.ticks_ms()
+        directed = "bssid" in wifi.load()
+        print(f"Connecting to Wi-Fi {self.ssid}{' (cached access point)' if directed else ''}...")
+        wifi.start(wlan, self.ssid, self.password)
+        if not await self._wait_wifi(wifi.DIRECTED_TIMEOUT_MS if directed else self.wifi_timeout * 1000):
+            if not directed:
+                self._wifi_failed()
+            print("Cached access point did not answer, connecting by SSID...")
+            wifi.forget()
+            wifi.start(wlan, self.ssid, self.password, directed=False)
+            if not await self._wait_wifi(self.wifi_timeout * 1000):
+                self._wifi_failed()
+        print(f"Connected to Wi-Fi in {time.ticks_diff(time.ticks_ms(), start)} ms, IP is: {wlan.ifconfig()[0]}")
+
+    async def _wait_wifi(self, timeout_ms):
+        start = time.ticks_ms()
+        while not self.wlan.isconnected():
+            if wifi.failed(self.wlan) or time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                return False
+            await asyncio.sleep_ms(50)
+        return True
+
+    def _wifi_failed(self):
+        status = self.wlan.status()
+        self.wlan.disconnect()
+        if status in (network.STAT_WRONG_PASSWORD, network.STAT_NO_AP_FOUND):
+            raise OSError(errno.EHOSTUNREACH, f"Wi-Fi status {status}")
+        raise OSError(errno.ETIMEDOUT, "Wi-Fi association timeout")
@@ -0,0 +1,382 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+try:
+    import errno
+except ImportError:
+    import uerrno as errno
+import time
+from umqttsimple import MQTTClient as _BlockingClient, MQTTException
+
+class MQTTClient(_BlockingClient):
+    """asyncio version of umqttsimple.MQTTClient.
+
+    Same constructor, packets and method names, but connect, disconnect, ping,
+    publish and subscribe are coroutines and all I/O goes through uasyncio
+    streams, so a slow or dead broker never blocks the event loop. After
+    connect() a reader task receives every packet from the broker and hands
+    PUBLISH messages to the callback; check_msg() and wait_msg() only report
+    a lost connection. timeout bounds every wait for a broker response. TLS
+    is not supported.
+
+    QoS 1 publishes are pipelined: publish() returns once the message is sent
+    and up to max_inflight messages may await their PUBACK at once; a further
+    publish waits for a free slot. Messages that were sent but not yet
+    acknowledged survive a lost connection and are sent again, with the DUP
+    flag, by the next connect() on the same client object. A publish whose
+    write fails raises and is not kept: the caller still owns that message
+    (main.py moves it to the flash backlog), so it is not delivered twice.
+    publish() returns the packet id of a QoS 1 message; a caller that keeps
+    its own copy can discard() it to stop the retransmission.
+
+    With keepalive set, a keepalive task sends PINGREQ whenever nothing has
+    been sent or nothing received for keepalive / 2 seconds. If the PINGRESP
+    is not back within timeout, the connection is declared dead, exactly as
+    if the reader had seen it drop. A half-open socket is therefore noticed
+    within keepalive / 2 + timeout seconds, even on a link that only sends.
+
+    Incoming QoS 1 messages are acknowledged before the callback sees them.
+    Together with connect(clean_session=False), whose return value is the
+    broker's session-present flag, this lets a node keep its subscriptions
+    and receive commands queued while it was offline.
+    """
+
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0,
+                 ssl=False, ssl_params={}, timeout=10, max_inflight=8):
+        super().__init__(client_id, server, port, user, password, keepalive, ssl, ssl_params)
+        self.timeout = timeout
+        self.max_inflight = max_inflight
+        self._inflight = []  # (pid, topic, msg, retain) awaiting PUBACK, oldest first
+        self._window = asyncio.Event()  # Set whenever an in-flight slot frees up
+        self.reader = None
+        self.writer = None
+        self._lock = asyncio.Lock()  # Serializes writers so packets never interleave
+        self._task = None
+        self._keepalive_task = None
+        self._last_tx = 0  # ticks_ms of the last packet sent / received
+        self._last_rx = 0
+        self._ping_pending = False
+        self.pings = 0  # PINGREQs sent and keepalive timeouts, for diagnostics
+        self.ping_timeouts = 0
+        self._acks = {}  # Packet id -> Event set when its SUBACK arrives
+        self._ack_codes = {}
+        self._error = None
+
+    def _str(self, s):
+        return s.encode() if isinstance(s, str) else s
+
+    def _write_str(self, s):
+        self.writer.write(struct.pack("!H", len(s)))
+        self.writer.write(s)
+
+    _send_str = _write_str  # The inherited one writes to self.sock, which this client never opens
+
+    async def connect(self, clean_session=True):
+        if self.ssl:
+            raise MQTTException("TLS is not supported by the async client")
+        self._close()
+        self._error = None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port), self.timeout)
+        try:
+            return await self._handshake(clean_session)
+        except Exception:
+            self._close()
+            raise
+
+    async def _handshake(self, clean_session):
+        client_id = self._str(self.client_id)
+        premsg = bytearray(b"\x10\0\0\0\0\0")
+        msg = bytearray(b"\x04MQTT\x04\x02\0\0")
+
+        sz = 10 + 2 + len(client_id)
+        msg[6] = clean_session << 1
+        if self.user is not None:
+            sz += 2 + len(self.user) + 2 + len(self.pswd)
+            msg[6] |= 0xC0
+        if self.keepalive:
+            assert self.keepalive < 65536
+            msg[7] |= self.keepalive >> 8
+            msg[8] |= self.keepalive & 0x00FF
+        if self.lw_topic:
+            sz += 2 + len(self.lw_topic) + 2 + len(self.lw_msg)
+            msg[6] |= 0x4 | (self.lw_qos & 0x1) << 3 | (self.lw_qos & 0x2) << 3
+            msg[6] |= self.lw_retain << 5
+
+        i = 1
+        while sz > 0x7f:
+            premsg[i] = (sz & 0x7f) | 0x80
+            sz >>= 7
+            i += 1
+        premsg[i] = sz
+
+        self.writer.write(premsg[:i + 2])
+        self.writer.write(msg)
+        self._write_str(client_id)
+        if self.lw_topic:
+            self._write_str(self._str(self.lw_topic))
+            self._write_str(self._str(self.lw_msg))
+        if self.user is not None:
+            self._write_str(self._str(self.user))
+            self._write_str(self._str(self.pswd))
+        await self._drain()
+        resp = await asyncio.wait_for(self.reader.readexactly(4), self.timeout)
+        assert resp[0] == 0x20 and resp[1] == 0x02
+        if resp[3] != 0:
+            raise MQTTException(resp[3])
+        self._last_rx = time.ticks_ms()
+        self._ping_pending = False
+        self._task = asyncio.create_task(self._read_loop())
+        if self.keepalive:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+        # Retransmit whatever the broker had not acknowledged before the link dropped.
+        for pid, topic, msg, retain in list(self._inflight):
+            await self._send_publish(topic, msg, retain, 1, pid, True)
+        return resp[2] & 1
+
+    async def disconnect(self):
+        try:
+            async with self._lock:
+                self.writer.write(b"\xe0\0")
+                await self._drain()
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def ping(self):
+        async with self._lock:
+            self.writer.write(b"\xc0\0")
+            self._ping_pending = True
+            await self._drain()
+        self.pings += 1
+
+    async def _drain(self):
+        await self.writer.drain()
+        self._last_tx = time.ticks_ms()
+
+    async def _keepalive_loop(self):
+        interval = self.keepalive * 500  # ms, half the keepalive agreed with the broker
+        while True:
+            now = time.ticks_ms()
+            idle = max(time.ticks_diff(now, self._last_tx), time.ticks_diff(now, self._last_rx))
+            if idle < interval:
+                await asyncio.sleep((interval - idle) / 1000)
+                continue
+            try:
+                await self.ping()
+            except Exception as e:
+                self._lost(e)
+                return
+            await asyncio.sleep(self.timeout)
+            if self._ping_pending:
+                self.ping_timeouts += 1
+                self._lost(OSError(errno.ETIMEDOUT, "no PINGRESP"))
+                if self._task is not None:
+                    self._task.cancel()  # The reader may be stuck on a half-open socket
+                    self._task = None
+                return
+
+    @property
+    def connected(self):
+        """True while connected and the reader task has not seen the link drop."""
+        return self.writer is not None and self._error is None
+
+    @property
+    def inflight(self):
+        """Number of QoS 1 messages still waiting for their PUBACK."""
+        return len(self._inflight)
+
+    async def publish(self, topic, msg, retain=False, qos=0):
+        if qos == 2:
+            raise MQTTException("QoS 2 is not supported")
+        topic = self._str(topic)
+        msg = self._str(msg)
+        pid = 0
+        if qos == 1:
+            while len(self._inflight) >= self.max_inflight:
+                self._window.clear()
+                await asyncio.wait_for(self._window.wait(), self.timeout)
+                if self._error is not None:
+                    raise OSError(-1)
+            pid = self._next_pid()
+            if isinstance(msg, memoryview):
+                msg = bytes(msg)  # Kept for retransmission, the caller may reuse its buffer
+            # Tracked before sending, so a PUBACK racing the end of the write still finds it.
+            self._inflight.append((pid, topic, msg, retain))
+        try:
+            await self._send_publish(topic, msg, retain, qos, pid, False)
+        except Exception:
+            if qos == 1:
+                self.discard(pid)
+            raise
+        return pid
+
+    async def flush(self):
+        """Wait until every in-flight QoS 1 message has been acknowledged."""
+        while self._inflight:
+            self._window.clear()
+            await asyncio.wait_for(self._window.wait(), self.timeout)
+            if self._error is not None:
+                raise OSError(-1)
+
+    async def _send_publish(self, topic, msg, retain, qos, pid, dup):
+        pkt = bytearray(b"\x30\0\0\0")
+        pkt[0] |= qos << 1 | retain
+        if dup:
+            pkt[0] |= 0x08
+        sz = 2 + len(topic) + len(msg)
+        if qos > 0:
+            sz += 2
+        assert sz < 2097152
+        i = 1
+        while sz > 0x7f:
+            pkt[i] = (sz & 0x7f) | 0x80
+            sz >>= 7
+            i += 1
+        pkt[i] = sz
+        async with self._lock:
+            if self.writer is None:  # Between a drop and the next connect()
+                raise OSError(errno.ENOTCONN, "not connected")
+            self.writer.write(pkt[:i + 1])
+            self._write_str(topic)
+            if qos > 0:
+                self.writer.write(struct.pack("!H", pid))
+            self.writer.write(msg)
+            await self._drain()
+
+    def discard(self, pid):
+        """Stop tracking the in-flight message pid (as returned by publish), e.g. because the caller resends it itself."""
+        for i in range(len(self._inflight)):
+            if self._inflight[i][0] == pid:
+                self._inflight.pop(i)
+                self._window.set()
+                return
+
+    def _next_pid(self):
+        # 1..65535, skipping ids still in flight after a wrap-around.
+        while True:
+            self.pid = self.pid % 65535 + 1
+            for entry in self._inflight:
+                if entry[0] == self.pid:
+                    break
+            else:
+                return self.pid
+
+    async def subscribe(self, topic, qos=0):
+        assert self.cb is not None, "Subscribe callback is not set"
+        topic = self._str(topic)
+        pkt = bytearray(b"\x82\0\0\0")
+        pid = self._next_pid()
+        struct.pack_into("!BH", pkt, 1, 2 + 2 + len(topic) + 1, pid)
+        ack = self._expect_ack(pid)
+        async with self._lock:
+            self.writer.write(pkt)
+            self._write_str(topic)
+            self.writer.write(qos.to_bytes(1, "little"))
+            await self._drain()
+        if await self._wait_ack(pid, ack) == 0x80:
+            raise MQTTException(0x80)
+
+    def _expect_ack(self, pid):
+        # Registered before the packet is sent so a fast broker's reply cannot be missed.
+        ev = asyncio.Event()
+        self._acks[pid] = ev
+        return ev
+
+    async def _wait_ack(self, pid, ev):
+        try:
+            await asyncio.wait_for(ev.wait(), self.timeout)
+        finally:
+            self._acks.pop(pid, None)
+        if self._error is not None:
+            raise OSError(-1)
+        return self._ack_codes.pop(pid, None)
+
+    async def _recv_len(self):
+        n = 0
+        sh = 0
+        while 1:
+            b = (await self.reader.readexactly(1))[0]
+            n |= (b & 0x7f) << sh
+            if not b & 0x80:
+                return n
+            sh += 7
+
+    async def _read_loop(self):
+        try:
+            while True:
+                op = (await self.reader.readexactly(1))[0]
+                sz = await self._recv_len()
+                body = await self.reader.readexactly(sz) if sz else b""
+                self._last_rx = time.ticks_ms()
+                await self._dispatch(op, body)
+        except Exception as e:
+            self._lost(e)
+
+    def _lost(self, e):
+        # Connection lost: fail anyone waiting for an ack, check_msg() reports it.
+        if self._error is None:
+            self._error = e
+        for ev in self._acks.values():
+            ev.set()
+        self._window.set()
+
+    async def _dispatch(self, op, body):
+        kind = op & 0xf0
+        if kind == 0x30:  # PUBLISH
+            topic_len = (body[0] << 8) | body[1]
+            topic = body[2:2 + topic_len]
+            pos = 2 + topic_len
+            if op & 6:
+                pid = (body[pos] << 8) | body[pos + 1]
+                pos += 2
+            if op & 6 == 4:
+                raise MQTTException("QoS 2 is not supported")
+            if op & 6 == 2:
+                # Acknowledged before the callback runs, so a handler that resets the
+                # board does not get the message redelivered by a persistent session.
+                pkt = bytearray(b"\x40\x02\0\0")
+                struct.pack_into("!H", pkt, 2, pid)
+                async with self._lock:
+                    self.writer.write(pkt)
+                    await self._drain()
+            try:
+                self.cb(topic, body[pos:])
+            except Exception as e:
+                print(f"Error in MQTT callback: {e}")
+        elif kind == 0x40:  # PUBACK
+            self.discard((body[0] << 8) | body[1])
+        elif kind == 0xd0:  # PINGRESP
+            self._ping_pending = False
+        elif kind == 0x90:  # SUBACK
+            pid = (body[0] << 8) | body[1]
+            ev = self._acks.get(pid)
+            if ev is not None:
+                self._ack_codes[pid] = body[2]
+                ev.set()
+
+    # Messages are delivered by the reader task as they arrive. This only
+    # raises if that task has seen the connection drop, so existing
+    # check-and-reconnect loops keep working.
+    def check_msg(self):
+        if self._error is not None:
+            raise OSError(-1)
+        return None
+
+    # There is no socket to block on: wait_msg() behaves like check_msg().
+    wait_msg = check_msg
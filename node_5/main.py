@@ -2,12 +2,17 @@ import machine
 import uasyncio as asyncio
 import json
 from machine import Pin, I2C
-from machine import SoftSPI
-from umqtt.simple import MQTTClient
+from umqttasync import MQTTClient
 import max31865
+import spi_device
+import mpu6050
+import vibration
+import flashqueue
+import telemetry
+import link
+import installer
 from ota import OTAUpdater
 import gc
-import math
 import time
 import ubinascii
 
@@ -16,31 +21,80 @@ RTD_NOMINAL = 100.0  # Resistance of RTD at 0°C
 RTD_REFERENCE = 402.0  # Reference resistor on the PCB
 RTD_WIRES = 3  # 3-wire configuration
 MPU6050_ADDR = 0x68  # I2C address of the MPU6050 sensor
-PWR_MGMT_1 = 0x6B  # Power management register
+USE_FIFO = True  # Sample through the MPU6050 hardware FIFO instead of polling
+SAMPLE_RATE_HZ = 1000  # FIFO sample rate (accelerometer output tops out at 1 kHz)
+MPU_DLPF_CFG = 1  # MPU6050 low-pass: 1 = 184 Hz accelerometer bandwidth, 0 = 260 Hz (mpu6050.ACCEL_BANDWIDTH_HZ)
+FIFO_DRAIN_MS = 20  # FIFO holds 170 samples, ~170 ms of headroom at 1 kHz
+WINDOW_SAMPLES = 512  # Samples per analysis window (power of two for the FFT)
+WINDOW_ATTEMPTS = 3  # Windows cut by a FIFO overflow are discarded and retried this many times per reading
+FFT_AXIS = 0  # Axis fed to the spectrum: 0 = X, 1 = Y, 2 = Z
+VELOCITY_CUTOFF_HZ = 10.0  # Lower edge of the ISO 10816 velocity band
+RUNNING_SPEED_HZ = 25.0  # Shaft speed of the monitored machine (1500 rpm)
+# Band-energy features as (low Hz, high Hz). Only content below SAMPLE_RATE_HZ / 2 and
+# the DLPF bandwidth can be resolved; bands above either are published as null.
+SPECTRUM_BANDS = (
+    (0.8 * RUNNING_SPEED_HZ, 1.2 * RUNNING_SPEED_HZ),  # 1x: imbalance
+    (1.8 * RUNNING_SPEED_HZ, 2.2 * RUNNING_SPEED_HZ),  # 2x: misalignment, looseness
+    (2.8 * RUNNING_SPEED_HZ, 10.2 * RUNNING_SPEED_HZ),  # 3x-10x harmonics
+    (100.0, 180.0),  # Top of the DLPF passband (184 Hz at MPU_DLPF_CFG 1), early bearing wear
+    (1000.0, 5000.0),  # Classic bearing band, needs a faster sensor
+)
 BROKER = "192.168.1.101"  # MQTT broker
 PORT = 1883  # MQTT port
 REBOOT_TOPIC = "remote_control"  # Topic for receiving commands
+MQTT_QOS = 1  # Telemetry QoS; QoS 1 is pipelined, up to MQTT_MAX_INFLIGHT awaiting PUBACK
+MQTT_MAX_INFLIGHT = 8
+MQTT_KEEPALIVE = 30  # Seconds; PINGREQ after KEEPALIVE / 2 idle, a dead link is noticed within ~KEEPALIVE / 2 + 10 s
+LINK_BACKOFF_BASE = 1  # Seconds; reconnect attempts wait a random 0..BASE * 2**failures, capped at MAX
+LINK_BACKOFF_MAX = 300
+MQTT_CLEAN_SESSION = False  # Keep the broker-side session: subscriptions and queued QoS 1 commands survive reconnects
+BACKLOG_DIR = "/backlog"  # Flash store-and-forward queue for readings taken while offline
+BACKLOG_MAX_BYTES = 64 * 1024  # Flash the queue may use; oldest readings are dropped beyond this
+BACKLOG_RECORD_SIZE = 256  # Bytes per stored reading (longer payloads are truncated)
+BACKLOG_BATCH = 10  # Readings replayed per batch once the broker is back
+BACKLOG_INTERVAL = 2  # Seconds between replay batches, keeps the catch-up rate bounded
 ##########################Update This########################
 NODE_ID = 5
 #############################################################
 TOPIC = f"OC7/data/N{NODE_ID}"  # Topic for publishing
+STATS_TOPIC = f"OC7/stats/N{NODE_ID}"  # Topic for per-window vibration statistics
+PAYLOAD_FORMAT = "binary"  # "binary" (telemetry.py, ~27 bytes) or "text" (the original readable string)
+READING_INTERVAL_MS = 2000  # Pause between readings; with batching it can drop ~10x without more packets
+BATCH_SIZE = 1  # Readings packed into one MQTT message, 1 publishes every reading on its own
+BATCH_MAX_AGE_MS = 10000  # A partial batch is published once its oldest reading is this old
+REPORT_BY_EXCEPTION = False  # Publish only when a metric leaves its deadband, or every HEARTBEAT_S
+DEADBAND_TEMP_C = 0.2  # Temperature (RTD channel 0)
+DEADBAND_ACC_G = (0.002, 0.002, 0.002)  # Acceleration RMS, X / Y / Z
+DEADBAND_VEL_MM_S = (0.1, 0.1, 0.1)  # Velocity RMS, X / Y / Z
+HEARTBEAT_S = 60  # Longest silence in report-by-exception mode
+HEALTHY_AFTER_S = 120  # A newly installed firmware is kept once the link has been up this long after boot
 firmware_url = "https://github.com/atonughosh/tsdpl_vib_temp"
 SSID = "OC7"
 PASSWORD = "oc7@bara"
 
 # SPI and I2C setup
-sck = machine.Pin(18, machine.Pin.OUT)
-mosi = machine.Pin(23, machine.Pin.OUT)
-miso = machine.Pin(19, machine.Pin.IN)
-spi = machine.SoftSPI(baudrate=50000, sck=sck, mosi=mosi, miso=miso, polarity=0, phase=1)
+RTD_SPI_BACKEND = "auto"  # "hard", "soft", or "auto" (hardware SPI when the pins allow it)
+RTD_SPI_BAUDRATE = 1000000  # Hardware SPI clock, the MAX31865 accepts up to 5 MHz
+spi = spi_device.open_spi(18, 23, 19, backend=RTD_SPI_BACKEND, baudrate=RTD_SPI_BAUDRATE,
+                          soft_baudrate=50000, polarity=0, phase=1)  # sck, mosi, miso
+print(f"RTD SPI bus: {spi}")
 cs1 = machine.Pin(5, machine.Pin.OUT, value=1)
-css = [cs1]
-sensors = [max31865.MAX31865(spi, cs, wires=RTD_WIRES, rtd_nominal=RTD_NOMINAL, ref_resistor=RTD_REFERENCE) for cs in css]
+css = [cs1]  # One chip select per RTD channel, up to 8 (bearing DE/NDE, winding, ambient...)
+sensors = [max31865.MAX31865(spi, cs, wires=RTD_WIRES, rtd_nominal=RTD_NOMINAL, ref_resistor=RTD_REFERENCE, lookup_table=True) for cs in css]
+RTD_CONTINUOUS = True  # Keep bias on and let the MAX31865 auto-convert, reads become one SPI transaction
+for sensor in sensors:
+    sensor.set_continuous(RTD_CONTINUOUS)
+rtd_scanner = max31865.RTDScanner(sensors)  # Converts all channels in parallel
 
 # I2C setup for MPU6050
 scl_pin = machine.Pin(22)
 sda_pin = machine.Pin(21)
 i2c = I2C(0, scl=scl_pin, sda=sda_pin, freq=400000)
+mpu = mpu6050.MPU6050(i2c, MPU6050_ADDR)
+fifo_buf = bytearray(mpu6050.FRAME_BYTES * 32)  # Drained in chunks of up to 32 samples
+vib_stats = vibration.VibrationStats()  # Reused for every window
+spectrum = vibration.Spectrum(WINDOW_SAMPLES, SAMPLE_RATE_HZ)  # Preallocated FFT buffers
+velocity = vibration.VelocityRMS(SAMPLE_RATE_HZ, VELOCITY_CUTOFF_HZ)  # Integrated velocity, mm/s
 
 # Update below this
 
@@ -51,6 +105,22 @@ OFFSET_FILE = "mpu6050_offsets.json"
 
 last_error_time = 0  # Global variable to track last error print time
 
+mqtt_client = None  # Kept across reconnects so unacknowledged QoS 1 messages are retransmitted
+backlog = flashqueue.FlashQueue(BACKLOG_DIR, record_size=BACKLOG_RECORD_SIZE, records_per_segment=16,
+                                max_segments=max(2, BACKLOG_MAX_BYTES // (BACKLOG_RECORD_SIZE * 16)))
+clock_synced = False
+boot_ms = time.ticks_ms()
+encoder = telemetry.TelemetryEncoder(NODE_ID, max_channels=len(sensors))  # Reused payload buffer
+deadband = None  # Report-by-exception filter, see REPORT_BY_EXCEPTION
+if REPORT_BY_EXCEPTION:
+    deadband = telemetry.Deadband((DEADBAND_TEMP_C,) + DEADBAND_ACC_G + DEADBAND_VEL_MM_S, HEARTBEAT_S * 1000)
+batch = None  # Readings waiting for the next batched publish
+if BATCH_SIZE > 1:
+    batch = telemetry.TelemetryBatch(
+        BATCH_SIZE, BATCH_MAX_AGE_MS, BACKLOG_RECORD_SIZE if PAYLOAD_FORMAT == "text" else
+        telemetry.HEADER_SIZE + telemetry.VALUES_SIZE + telemetry.CHANNEL_SIZE * len(sensors),
+        text=PAYLOAD_FORMAT == "text")
+
 
 # Global variable for offsets
 #offsets = (0, 0, 0)
@@ -79,15 +149,20 @@ offsets = load_offsets_from_file()
 async def detect_mpu6050():
     try:
         # Read a known register to confirm presence (WHO_AM_I register, 0x75, should return 0x68)
-        data = i2c.readfrom_mem(MPU6050_ADDR, 0x75, 1)
-        return data[0] == 0x68  # True if MPU6050 is detected
+        return mpu.detect()  # True if MPU6050 is detected
     except Exception:
         return False
 
 async def initialize_mpu6050():
     try:
         # Wake up the MPU6050 as it starts in sleep mode
-        i2c.writeto_mem(MPU6050_ADDR, PWR_MGMT_1, b'\x00')  # Write 0 to PWR_MGMT_1 to wake it up
+        mpu.wake()  # Write 0 to mpu6050.PWR_MGMT_1 to wake it up
+        if USE_FIFO:
+            rate = mpu.configure_fifo(SAMPLE_RATE_HZ, MPU_DLPF_CFG)
+            spectrum.sample_rate = rate
+            spectrum.max_hz = mpu.bandwidth_hz
+            velocity.set_sample_rate(rate)
+            print(f"MPU6050 FIFO sampling at {rate} Hz.")
         print("MPU6050 initialized successfully.")
         return True
     except Exception as e:
@@ -95,6 +170,11 @@ async def initialize_mpu6050():
         return False
 
 
+async def reboot_soon():
+    # Give the PUBACK for the command time to leave, or the persistent session would redeliver it after the reset.
+    await asyncio.sleep(1)
+    machine.reset()
+
 # MQTT callback function
 def on_message(topic, msg):
     print(f"Received message on {topic}: {msg}")
@@ -106,7 +186,7 @@ def on_message(topic, msg):
     # Check if the message is a "reboot" command
     if topic_str == REBOOT_TOPIC and msg_str == "reboot":
         print("Reboot command received. Rebooting device...")
-        machine.reset()
+        asyncio.create_task(reboot_soon())
     
     # Handle calibration command
     elif topic_str == REBOOT_TOPIC and msg_str == "calibrate":
@@ -126,63 +206,133 @@ async def get_firmware_version():
         print(f"Failed to read version file: {e}")
         return "0"
 
-def generate_random_id(length=8):
-    """Generate a random ID of the specified length."""
-    random_bytes = os.urandom(length // 2)  # Generate random bytes
-    return ubinascii.hexlify(random_bytes).decode().upper()
+def stable_client_id():
+    """Client id derived from the chip's unique id (its MAC on the ESP32), the same across reboots."""
+    return f"OC7-N{NODE_ID}-{ubinascii.hexlify(machine.unique_id()).decode().upper()}"
 
 async def connect_mqtt():
+    # Called by the link supervisor once Wi-Fi is up; errors propagate to it for backoff.
+    global mqtt_client
+    if mqtt_client is None:
+        mqtt_client = MQTTClient(stable_client_id().encode(), BROKER, port=PORT, keepalive=MQTT_KEEPALIVE,
+                                 max_inflight=MQTT_MAX_INFLIGHT)
+        mqtt_client.set_callback(on_message)
+    client = mqtt_client
+    session_present = await client.connect(clean_session=MQTT_CLEAN_SESSION)
+    if session_present:
+        print(f"Connected to MQTT broker as {client.client_id.decode()}, resumed session")
+    else:
+        # QoS 1, so the broker queues commands sent while this node is offline
+        await client.subscribe(REBOOT_TOPIC, qos=1)
+        print(f"Connected to MQTT broker as {client.client_id.decode()} and subscribed to topic")
+    if client.inflight:
+        print(f"Retransmitted {client.inflight} unacknowledged message(s).")
+    sync_clock()
+    gc.collect()
+    return client
+
+supervisor = link.LinkSupervisor(SSID, PASSWORD, connect_mqtt, base_delay=LINK_BACKOFF_BASE,
+                                 max_delay=LINK_BACKOFF_MAX)  # Owns all Wi-Fi and MQTT reconnects
+
+def sync_clock():
+    # Set the RTC from NTP once, so stored readings carry real timestamps.
+    global clock_synced
+    if clock_synced:
+        return
     try:
-        # Generate a random ID for the MQTT client
-        random_id = generate_random_id()
-        
-        client = MQTTClient(random_id.encode(), BROKER, port=PORT, keepalive=60)
-        client.set_callback(on_message)
-        client.connect()
-        client.subscribe(REBOOT_TOPIC)  # Subscribe to the reboot topic
-        print(f"Connected to MQTT broker as {random_id} and subscribed to topic")
-        gc.collect()
-        return client
+        import ntptime
+        ntptime.settime()
+        clock_synced = True
+        print("Clock set from NTP.")
     except Exception as e:
-        print(f"Failed to connect to MQTT broker: {e}")
-        return None
-    
-async def reconnect_mqtt(client):
+        print(f"NTP sync failed: {e}")
+
+def unix_time():
+    # time.time() counts from 2000 on older MicroPython ports, from 1970 on newer ones.
+    return time.time() + (946684800 if time.gmtime(0)[0] == 2000 else 0)
+
+def store_reading(data):
     try:
-        if client:  # Disconnect only if the client exists
-            print("Disconnecting existing MQTT client...")
-            client.disconnect()
-            gc.collect()
+        backlog.put(data, unix_time())
+        print(f"Stored reading offline ({len(backlog)} queued).")
     except Exception as e:
-        print(f"Error during disconnection: {e}")
-    
-    # Wait for a short period before attempting to reconnect
-    await asyncio.sleep(1)
-    return await connect_mqtt()
+        print(f"Error storing reading: {e}")
 
-async def publish_data(client, data):
-    if client:
+async def publish_data(data, topic=TOPIC):
+    if not supervisor.up:
+        if topic == TOPIC:
+            store_reading(data)
+        return
+    try:
+        await supervisor.client.publish(topic, data, qos=MQTT_QOS)
+        print(f"Published: {data}" if isinstance(data, str) else f"Published {len(data)} bytes to {topic}")
+        gc.collect()
+    except Exception as e:
+        print(f"Error publishing: {e}")
+        if topic == TOPIC:
+            store_reading(data)
+        supervisor.report(e)
+
+def store_batch():
+    # Move held readings to the flash backlog one by one, so each fits a backlog record.
+    for timestamp, payload in batch.records():
         try:
-            client.publish(TOPIC, data)
-            print(f"Published: {data}")
-            gc.collect()
+            backlog.put(payload, timestamp)
         except Exception as e:
-            print(f"Error publishing: {e}")
-            client = await reconnect_mqtt(client)
-    return client
-
-async def check_mqtt_messages(client):
+            print(f"Error storing reading: {e}")
+    if batch.count:
+        print(f"Stored {batch.count} batched reading(s) offline ({len(backlog)} queued).")
+    batch.clear()
+
+async def publish_batched(data):
+    """Add a reading to the batch and publish the batch once it is full or old enough."""
+    if not supervisor.up:
+        store_batch()
+        store_reading(data)
+        return
+    batch.add(data, unix_time())
+    await flush_batch()
+
+async def flush_batch():
+    """Publish the batch if it is full or its oldest reading has reached BATCH_MAX_AGE_MS."""
+    if not batch.due():
+        return
+    if not supervisor.up:
+        store_batch()
+        return
     try:
-        if client:  # Ensure the client exists
-            # Attempt to check for incoming MQTT messages
-            client.check_msg()  # Non-blocking call to check for incoming MQTT messages
-        else:
-            print("MQTT client is None, reconnecting...")
-            client = await reconnect_mqtt(client)  # Attempt reconnection if client is None
+        await supervisor.client.publish(TOPIC, batch.frame(), qos=MQTT_QOS)
+        print(f"Published batch of {batch.count} reading(s)")
+        batch.clear()
+        gc.collect()
     except Exception as e:
-        print(f"Error checking MQTT messages: {e}")
-        client = await reconnect_mqtt(client)  # Reconnect if error occurs
-    return client
+        print(f"Error publishing batch: {e}")
+        store_batch()
+        supervisor.report(e)
+
+async def backlog_task():
+    """Replay readings stored while offline, BACKLOG_BATCH at a time, with their original timestamps."""
+    while True:
+        await asyncio.sleep(BACKLOG_INTERVAL)
+        if not len(backlog) or not supervisor.up:
+            continue
+        client = supervisor.client
+        pids = []
+        try:
+            records = backlog.peek(BACKLOG_BATCH)
+            for timestamp, payload in records:
+                if payload is not None:
+                    if payload[:1] == b"N":  # Text payload; binary ones already carry their timestamp
+                        payload += f", TS: {timestamp}".encode()
+                    pids.append(await client.publish(TOPIC, payload, qos=1))
+            await client.flush()  # Only forget the batch once the broker has acknowledged it
+            backlog.commit(len(records))
+            print(f"Replayed {len(records)} stored reading(s), {len(backlog)} left, {backlog.dropped} dropped.")
+        except Exception as e:
+            print(f"Error replaying stored readings: {e}")
+            for pid in pids:
+                client.discard(pid)  # The batch stays in the backlog and is replayed whole, not retransmitted too
+            supervisor.report(e)
 
 # async def read_accel():
 #     try:
@@ -197,28 +347,60 @@ async def check_mqtt_messages(client):
 async def read_accel(i2c, offsets):
     ax_offset, ay_offset, az_offset = offsets
     try:
-        ax = read_i2c_word(i2c, 0x3B) - ax_offset
-        ay = read_i2c_word(i2c, 0x3D) - ay_offset
-        az = read_i2c_word(i2c, 0x3F) - az_offset
+        ax, ay, az = read_accel_raw()  # One burst read for all three axes
+        ax -= ax_offset
+        ay -= ay_offset
+        az -= az_offset
         return ax / 16384.0, ay / 16384.0, az / 16384.0
     except Exception as e:
         print(f"Error reading accelerometer: {e}")
         return 0.0, 0.0, 0.0
     
-async def calculate_rms(i2c, offsets, num_samples=500):
-    ax_squared, ay_squared, az_squared = 0, 0, 0
-    
-    for _ in range(num_samples):
-        ax, ay, az = await read_accel(i2c, offsets)
-        ax_squared += ax ** 2
-        ay_squared += ay ** 2
-        az_squared += az ** 2
-        await asyncio.sleep(0)  # Yield control to other tasks
-    return (
-        math.sqrt(ax_squared / num_samples),
-        math.sqrt(ay_squared / num_samples),
-        math.sqrt(az_squared / num_samples),
-    )
+async def acquire_window(i2c, offsets, num_samples, consumer):
+    """Feed num_samples accelerometer readings (in g, offsets removed) to consumer(ax, ay, az).
+
+    With USE_FIFO the chip samples at a fixed rate and the FIFO is drained in
+    bulk every FIFO_DRAIN_MS, so other tasks can run in between without samples
+    being lost. Otherwise the registers are polled as fast as the loop allows.
+    Returns False if the FIFO overflowed, leaving a gap in what was fed.
+    """
+    if not (USE_FIFO and mpu.sample_rate):
+        for _ in range(num_samples):
+            ax, ay, az = await read_accel(i2c, offsets)
+            consumer(ax, ay, az)
+            await asyncio.sleep(0)  # Yield control to other tasks
+        return True
+    return await mpu.read_window(fifo_buf, num_samples, consumer, offsets, FIFO_DRAIN_MS)
+
+def feed_window(ax, ay, az):
+    vib_stats.add(ax, ay, az)
+    velocity.add(ax, ay, az)
+    spectrum.add(ax if FFT_AXIS == 0 else ay if FFT_AXIS == 1 else az)
+
+async def calculate_stats(i2c, offsets, num_samples=WINDOW_SAMPLES):
+    """Acquire one contiguous window and return vib_stats holding its per-axis statistics, or None."""
+    for attempt in range(WINDOW_ATTEMPTS):
+        vib_stats.reset()
+        spectrum.reset()
+        velocity.reset()
+        gc.collect()  # Collect once per window, not per sample
+        if await acquire_window(i2c, offsets, num_samples, feed_window):
+            return vib_stats
+        print(f"MPU6050 FIFO overflowed, discarding the partial window ({attempt + 1}/{WINDOW_ATTEMPTS}).")
+    return None
+
+def spectrum_features():
+    """Band RMS values (g) of the last window, or None if it was not captured at a known rate."""
+    if not (USE_FIFO and mpu.sample_rate and spectrum.full):
+        return None
+    spectrum.compute()
+    return spectrum.features(SPECTRUM_BANDS)
+
+def velocity_rms():
+    """Per-axis velocity RMS (mm/s) of the last window, or None if it was not captured at a known rate."""
+    if not (USE_FIFO and mpu.sample_rate):
+        return None
+    return velocity.rms()
 
 async def calibrate_mpu6050(i2c):
     num_samples = 2000
@@ -227,9 +409,7 @@ async def calibrate_mpu6050(i2c):
     
     for _ in range(num_samples):
         try:
-            ax = read_i2c_word(i2c, 0x3B)
-            ay = read_i2c_word(i2c, 0x3D)
-            az = read_i2c_word(i2c, 0x3F)
+            ax, ay, az = read_accel_raw()
             ax_offset += ax
             ay_offset += ay
             az_offset += az
@@ -248,31 +428,53 @@ async def calibrate_mpu6050(i2c):
     return ax_offset, ay_offset, az_offset
 
 
-def read_i2c_word(i2c, register):
+def read_accel_raw():
     global last_error_time
     try:
-        data = i2c.readfrom_mem(MPU6050_ADDR, register, 2)
-        value = (data[0] << 8) | data[1]
-        if value >= 0x8000:
-            value -= 0x10000
-        gc.collect()
-        return value
+        return mpu.read_accel_raw()  # Single 6-byte transaction into a preallocated buffer
     except Exception as e:
         current_time = time.time()
         if current_time - last_error_time > 10:  # 10 seconds
-            print(f"Error reading I2C register {register}: {e}")
+            print(f"Error reading accelerometer registers: {e}")
             last_error_time = current_time
-        gc.collect()
-        return 0  # Return a default value to prevent further errors
+        return 0, 0, 0  # Return default values to prevent further errors
 
 async def read_temperature():
     try:
         gc.collect()
-        return sensors[0].temperature
+        await rtd_scanner.scan()
+        return rtd_scanner.temperature(0)
     except Exception as e:
         print(f"Error reading temperature: {e}")
         return None
     
+def binary_payload(firmware_version, stats, vel, temperature_ok):
+    # Fixed-point values packed into the encoder's reused buffer, see telemetry.py.
+    status = 0
+    if stats is not None:
+        status |= telemetry.STATUS_ACCEL
+    if vel is not None:
+        status |= telemetry.STATUS_VELOCITY
+    if temperature_ok:
+        status |= telemetry.STATUS_TEMPERATURE
+    if clock_synced:
+        status |= telemetry.STATUS_CLOCK
+    try:
+        firmware_version = int(firmware_version)
+    except ValueError:
+        firmware_version = 0  # "unknown"
+    temps = [rtd_scanner.centidegrees(i) for i in range(len(sensors))]
+    return encoder.encode(status, firmware_version, unix_time(), stats.rms() if stats is not None else None,
+                          vel, temps, rtd_scanner.faults)
+
+def rtd_channels_text():
+    # Every RTD channel from the last scan with its own MAX31865 fault status byte.
+    text = ""
+    for i in range(len(sensors)):
+        t = rtd_scanner.temperature(i)
+        text += (f", T{i}: {t:.2f}C" if t is not None else f", T{i}: 999C") + f", F{i}: {rtd_scanner.faults[i]:02X}"
+    return text
+
 async def trigger_calibration():
     global offsets
     try:
@@ -291,10 +493,12 @@ async def ota_task():
     
     while True:
         try:
+            while not supervisor.wifi_up:
+                await asyncio.sleep(5)  # The supervisor brings Wi-Fi up, the OTA check must not block on it
             gc.collect()
             print("Starting OTA check...")
             
-            ota_updater = OTAUpdater(SSID, PASSWORD, firmware_url, "main.py", NODE_ID)
+            ota_updater = OTAUpdater(SSID, PASSWORD, firmware_url, "main.py", NODE_ID, manage_wifi=False)
             
             # Check for updates
             if await ota_updater.check_for_updates():
@@ -350,27 +554,18 @@ async def mpu6050_task():
 
 
 async def temperature_task():
-    client = None
     firmware_version = await get_firmware_version()
     
     while True:
         try:
-            # Ensure client is connected before checking for MQTT messages
-            if client is None:
-                print("MQTT client is None, attempting to reconnect...")
-                client = await connect_mqtt()
-                if client is None:
-                    print("Failed to reconnect MQTT client, retrying after delay.")
-                    await asyncio.sleep(5)
-                    continue  # Skip the rest of the loop and try reconnecting again
-            
-            # Check for incoming MQTT messages
-            client = await check_mqtt_messages(client)
-            
             # Only read accelerometer data if MPU6050 is initialized
             if mpu6050_initialized:
                 try:
-                    ax, ay, az = await calculate_rms(i2c, offsets)
+                    stats = await calculate_stats(i2c, offsets)
+                    if stats is None:
+                        print("No contiguous accelerometer window. Skipping cycle.")
+                        continue
+                    ax, ay, az = stats.rms()
                     if ax is None or ay is None or az is None:
                         print("Invalid accelerometer data. Skipping cycle.")
                         continue
@@ -378,7 +573,10 @@ async def temperature_task():
                     print(f"Error reading accelerometer: {e}")
                     continue
             else:
+                stats = None
                 ax, ay, az = None, None, None  # Placeholder if MPU6050 not initialized
+            vel = velocity_rms() if stats is not None else None
+            vx, vy, vz = vel if vel is not None else (None, None, None)
 
             temperature = await read_temperature()
             if temperature is None:
@@ -386,38 +584,64 @@ async def temperature_task():
                 await asyncio.sleep(5)
                 temperature = 999
 
+            if deadband is not None and not deadband.check(
+                    (temperature if temperature != 999 else None, ax, ay, az, vx, vy, vz)):
+                if deadband.suppressed % 100 == 0:
+                    print(f"Report by exception: {deadband.suppressed} suppressed, {deadband.published} published.")
+                if batch is not None:
+                    await flush_batch()  # Keeps the BATCH_MAX_AGE_MS promise while readings are suppressed
+                await asyncio.sleep_ms(READING_INTERVAL_MS)
+                continue
+
             # Prepare and publish data
-            data = (
-                        f"N{NODE_ID}, " +
-                        (f"AccX: {ax:.10f}, " if ax is not None else "AccX: 0.0, ") +
-                        (f"AccY: {ay:.10f}, " if ay is not None else "AccY: 0.0, ") +
-                        (f"AccZ: {az:.10f}, " if az is not None else "AccZ: 0.0, ") +
-                        f"Temp: {temperature:.8f}C, FW: {firmware_version}"
-                    )
+            if PAYLOAD_FORMAT == "binary":
+                data = binary_payload(firmware_version, stats, vel, temperature != 999)
+            else:
+                data = (
+                            f"N{NODE_ID}, " +
+                            (f"AccX: {ax:.10f}, " if ax is not None else "AccX: 0.0, ") +
+                            (f"AccY: {ay:.10f}, " if ay is not None else "AccY: 0.0, ") +
+                            (f"AccZ: {az:.10f}, " if az is not None else "AccZ: 0.0, ") +
+                            f"Temp: {temperature:.8f}C, FW: {firmware_version}, " +
+                            (f"VelX: {vx:.4f}, " if vx is not None else "VelX: 0.0, ") +
+                            (f"VelY: {vy:.4f}, " if vy is not None else "VelY: 0.0, ") +
+                            (f"VelZ: {vz:.4f}" if vz is not None else "VelZ: 0.0") +
+                            rtd_channels_text()
+                        )
   
-            client = await publish_data(client, data)
+            if batch is None:
+                await publish_data(data)
+            else:
+                await publish_batched(data)
+            if stats is not None and (batch is None or not batch.count):  # Once per batch when batching
+                stats_data = stats.as_dict()
+                stats_data["bands"] = spectrum_features()
+                stats_data["vel"] = vel
+                if deadband is not None:
+                    stats_data["rbe"] = {"published": deadband.published, "suppressed": deadband.suppressed,
+                                         "heartbeats": deadband.heartbeats}
+                await publish_data(json.dumps(stats_data), STATS_TOPIC)
             #print(f"Free memory: {gc.mem_free()} bytes")
             
             # Check for MQTT messages
             #client.check_msg()  # Ensure messages are handled
 
             # Delay before the next cycle
-            await asyncio.sleep(2)
+            await asyncio.sleep_ms(READING_INTERVAL_MS)
             
         except Exception as e:
             print(f"Error in temperature task: {e}")
-            # Handle specific errors
-            if str(e) == "[Errno 104] ECONNRESET":
-                print("MQTT connection reset by broker. Reconnecting...")
-                client = await reconnect_mqtt(client)  # Reconnect the MQTT client
-            elif str(e) == "-1":
-                print("Error -1 detected, attempting reconnection...")
-                client = await reconnect_mqtt(client)  # Attempt reconnection on -1 error
-            else:
-                print(f"Error in temperature task: {e}")
-                await asyncio.sleep(5)  # Delay to avoid busy loop during errors
+            supervisor.report(e)  # Network errors are left to the link supervisor to recover from
             await asyncio.sleep(5)  # Delay to avoid busy loop during errors
 
+async def health_task():
+    # New firmware runs on trial (installer.py) until it proves it can read sensors and reach the broker.
+    if not installer.on_trial():
+        return
+    while time.ticks_diff(time.ticks_ms(), boot_ms) < HEALTHY_AFTER_S * 1000 or not supervisor.up:
+        await asyncio.sleep(5)
+    installer.mark_healthy()
+
 #async def main():
     #await asyncio.gather(ota_task(), led_blink_task(), mpu6050_task(), temperature_task())
 async def auto_reboot_task(interval_hours=12):
@@ -433,9 +657,12 @@ async def main():
     gc.collect()
     # Run independent tasks
     tasks = [
+        asyncio.create_task(supervisor.run()),
         asyncio.create_task(ota_task()),
         asyncio.create_task(mpu6050_task()),
         asyncio.create_task(temperature_task()),
+        asyncio.create_task(backlog_task()),
+        asyncio.create_task(health_task()),
         asyncio.create_task(auto_reboot_task(4)),  # Auto-reboot every 4 hours
     ]
     await asyncio.gather(*tasks)
@@ -1,6 +1,9 @@
 import os
 import gc
 import uasyncio as asyncio
+import installer
+
+installer.boot_check()  # Roll back an interrupted or unhealthy firmware update before anything else runs
 
 # Import SSID and PASSWORD from WIFI_CONFIG.py
 try:
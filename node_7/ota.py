@@ -1,21 +1,58 @@
 import network
 import urequests
 import os
+import io
 import json
 import machine
 from time import sleep
 import time
 import gc
 import uasyncio as asyncio
+import wifi
+import tarstream
+import installer
+import bundle
+
+DOWNLOAD_CHUNK = 1024  # Bytes per socket read while streaming a download to flash
+STAGING_DIR = "/ota_stage"  # Firmware is extracted here before it replaces the live files
+HEAP_SAMPLE_READS = 32  # Peak heap is sampled every this many reads; the decompressor reads in small pieces
+
+
+class _MeteredReader(io.IOBase):
+    # Wraps the response socket to count bytes and track peak heap during a download.
+    # Subclasses io.IOBase so MicroPython's DeflateIO/DecompIO accept it as a stream.
+    def __init__(self, src):
+        self.src = src
+        self.total = 0
+        self.reads = 0
+        self.peak = gc.mem_alloc()
+
+    def readinto(self, buf):
+        n = self.src.readinto(buf)
+        if n:
+            self.total += n
+        self.reads += 1
+        if self.reads % HEAP_SAMPLE_READS == 0:
+            self.sample()
+        return n
+
+    def sample(self):
+        used = gc.mem_alloc()
+        if used > self.peak:
+            self.peak = used
+
 
 class OTAUpdater:
     """ This class handles OTA updates. It connects to the Wi-Fi, checks for updates, downloads and installs them."""
-    def __init__(self, ssid, password, repo_url, filename, node_id):
+    def __init__(self, ssid, password, repo_url, filename, node_id, manage_wifi=True):
         self.filename = filename
+        # False when an async owner (main.py's link supervisor) associates; the updater then only checks the link.
+        self.manage_wifi = manage_wifi
         self.ssid = ssid
         self.password = password
         self.repo_url = repo_url
         self.node_id = node_id  # Node ID for the specific node
+        self.staged = []  # (name, size) of the files fetch_firmware() extracted into STAGING_DIR
 
         if "www.github.com" in self.repo_url:
             #print(f"Updating {repo_url} to raw.githubusercontent")
@@ -46,6 +83,12 @@ class OTAUpdater:
     def connect_wifi(self):
         """ Connect to Wi-Fi with error handling. """
         sta_if = network.WLAN(network.STA_IF)
+        if not self.manage_wifi:
+            # Associating here would block the event loop and fight the link supervisor over the station.
+            if sta_if.isconnected():
+                return True
+            print("Wi-Fi is down, leaving the reconnect to the link supervisor.")
+            return False
         sta_if.active(True)
         
         # Check if already connected
@@ -56,100 +99,104 @@ class OTAUpdater:
                 print(f'IP is: {sta_if.ifconfig()[0]}')
                 return  True# Skip connection if already connected to the desired SSID
             else:
-                print(f"Already connected to {current_ssid}, but trying to connect to {ssid}. Reconnecting...")
+                print(f"Already connected to {current_ssid}, but trying to connect to {self.ssid}. Reconnecting...")
 
+        print("Connecting to WiFi...")
+        start = time.ticks_ms()
+        # Boot only: directed association to the cached access point, one scan if there is none or it fails.
         try:
-            print("Connecting to WiFi...")
-            time.sleep(10)
-            sta_if.connect(self.ssid, self.password)
-
-            # Wait for the connection with a timeout
-            timeout = 30  # Timeout in seconds
-            start_time = time.time()
-
-            while not sta_if.isconnected():
-                if time.time() - start_time > timeout:
-                    raise OSError("Wi-Fi connection timeout")
-                print('.', end="")  # Dot to show it's trying to connect
-                time.sleep(0.5)
-
-            print(f'Connected to WiFi, IP is: {sta_if.ifconfig()[0]}')
-            return True
-        
+            if wifi.connect(sta_if, self.ssid, self.password, timeout_ms=30000):
+                print(f'Connected to WiFi in {time.ticks_diff(time.ticks_ms(), start)} ms, IP is: {sta_if.ifconfig()[0]}')
+                return True
+            print("Error during Wi-Fi connection: timeout")
         except OSError as e:
             print(f"Error during Wi-Fi connection: {e}")
-            print("Rebooting the device to attempt reconnection...")
-            time.sleep(30)
-            machine.reset()  # Reboot ESP32 if Wi-Fi connection fails
+        # No reset here: main.py's link supervisor retries Wi-Fi with backoff.
+        return False
     
     def fetch_firmware(self):
-        """Download the firmware.tar.gz file."""
+        """Stream the firmware bundle off the socket and extract it into STAGING_DIR in one pass.
+
+        Firmware.tar.gz is tried first and decompressed on the fly, Firmware.tar
+        is the fallback when the repo has no compressed bundle. Nothing but the
+        extracted files is written to flash and RAM use is one DOWNLOAD_CHUNK
+        buffer plus the deflate window, whatever the member sizes. Each file is
+        hashed as it streams past and checked against the bundle manifest
+        (bundle.py). A truncated, corrupt, unsigned (with a key on the node) or
+        mismatched bundle fails the download and leaves the live files untouched.
+        """
         print("Downloading firmware...")
+        response = None
         try:
             print("Firmware URL:" + self.firmware_url)
-            response = urequests.get(self.firmware_url)
-            if response.status_code == 200:
-                with open("firmware.tar", "wb") as f:
-                    f.write(response.content)
-                print("Firmware downloaded successfully.")
-                return True
-            else:
+            tarstream.remove_tree(STAGING_DIR)  # Leftovers of an interrupted update
+            os.mkdir(STAGING_DIR)
+            gc.collect()
+            heap_before = gc.mem_alloc()
+            start = time.ticks_ms()
+            compressed = True
+            response = urequests.get(self.firmware_url + ".gz")
+            if response.status_code == 404:
+                response.close()
+                compressed = False
+                response = urequests.get(self.firmware_url)
+            if response.status_code != 200:
                 print(f"Failed to download firmware. Status: {response.status_code}")
+                return False
+            reader = _MeteredReader(response.raw)
+            buf = bytearray(DOWNLOAD_CHUNK)
+            src = tarstream.gunzip(reader) if compressed else reader
+            hashes = {}
+            staged = tarstream.extract(src, STAGING_DIR, buf, hashes)
+            if compressed:
+                tarstream.drain(src, buf)  # Reaches the gzip trailer, so its CRC is checked
+            reader.sample()
+            elapsed = max(1, time.ticks_diff(time.ticks_ms(), start))
+            print(f"Downloaded {reader.total} bytes{' (gzip)' if compressed else ''} in {elapsed} ms "
+                  f"({reader.total * 1000 // elapsed} B/s), "
+                  f"peak heap {reader.peak} bytes ({reader.peak - heap_before} above idle).")
+            # Only a bundle whose every file matches the manifest is installed.
+            self.staged = bundle.verify(STAGING_DIR, staged, hashes, self.latest_version)
+            if not self.staged:
+                print("Firmware archive is empty.")
+                return False
+            print(f"Firmware downloaded and staged: {', '.join(name for name, _ in self.staged)}")
+            return True
         except Exception as e:
             print(f"Error downloading firmware: {e}")
+        finally:
+            if response is not None:
+                response.close()
         return False
     
-    def extract_firmware(self):
-        """Extracts the firmware.tar file to the root directory."""
-        print("Extracting firmware...")
-        try:
-            with open("firmware.tar", "rb") as f:
-                while True:
-                    tar_header = f.read(512)  # Read 512-byte header blocks for tar files
-                    if not tar_header or len(tar_header) < 512:
-                        break
-                    
-                    # Extract filename and file size from the header
-                    filename = tar_header[0:100].strip(b'\x00').decode()
-                    file_size_str = tar_header[124:136].strip(b'\x00').decode()  # File size in octal
-
-                    # If file_size_str is empty or invalid, skip this entry
-                    if not file_size_str:
-                        continue
-
-                    try:
-                        file_size = int(file_size_str, 8)  # Convert octal to decimal
-                    except ValueError:
-                        print(f"Invalid file size '{file_size_str}' in file {filename}, skipping file.")
-                        continue  # Skip this file if the size is invalid
-                    
-                    if filename and file_size > 0:
-                        print(f"Extracting {filename}...")
-                        with open(filename, "wb") as out_file:
-                            out_file.write(f.read(file_size))
-                        # Move the read pointer to the next 512-byte block (pad to next multiple of 512)
-                        f.read((512 - file_size % 512) % 512)
-
-            print("Firmware extraction complete.")
-            os.remove("firmware.tar")  # Clean up the downloaded file
+    def install_firmware(self):
+        """Swap the staged files, with the new version.json, over the live ones (see installer.py).
 
+        The new firmware then runs on trial: it is rolled back at boot unless
+        main.py marks it healthy in time.
+        """
+        print("Installing firmware...")
+        try:
+            self.update_version_file()
+            if not installer.install(STAGING_DIR, self.staged, self.latest_version):
+                return False
+            print("Firmware installation complete.")
+            return True
         except Exception as e:
-            print(f"Error extracting firmware: {e}")
+            print(f"Error installing firmware: {e}")
+            return False
 
     def update_version_file(self):
-        """Update the version.json file on the ESP32."""
-        try:
-            with open(self.version_file_path, 'w') as f:
-                json.dump({'version': self.latest_version}, f)
-            print(f"Updated version.json to version {self.latest_version}")
-        except Exception as e:
-            print(f"Error updating version file: {e}")
+        """Stage version.json for the new version, so it is swapped in (and rolled back) with the files."""
+        path = f"{STAGING_DIR}/version.json"
+        with open(path, 'w') as f:
+            json.dump({'version': self.latest_version}, f)
+        self.staged = [entry for entry in self.staged if entry[0] != "version.json"]
+        self.staged.append(("version.json", os.stat(path)[6]))
             
     def update_and_reset(self):
         """Perform OTA update and reset the device if successful."""
-        if self.connect_wifi() and self.fetch_firmware():
-            self.extract_firmware()
-            self.update_version_file()  # Update the version file with the new version
+        if self.connect_wifi() and self.fetch_firmware() and self.install_firmware():
             print("Update successful! Restarting...")
             time.sleep(1)
             machine.reset()
@@ -158,7 +205,8 @@ class OTAUpdater:
     
     async def check_for_updates(self):
         """ Check if updates are available, without retry logic, only handling exceptions. """
-        self.connect_wifi()
+        if not self.connect_wifi():
+            return False
         await asyncio.sleep(30)
         gc.collect()
 
@@ -186,6 +234,9 @@ class OTAUpdater:
                     # Check if the fetched version is newer than the current version
                     self.latest_version = fetched_version
                     newer_version_available = self.current_version < self.latest_version
+                    if newer_version_available and self.latest_version == installer.failed_version():
+                        print(f"Version {self.latest_version} was rolled back before, not installing it again.")
+                        newer_version_available = False
                     print(f'Newer version available: {newer_version_available}')
 
                     if newer_version_available:
@@ -0,0 +1,159 @@
+import json
+import os
+import machine
+import tarstream
+
+JOURNAL = "/ota_journal.json"  # Present only while an install is in progress or on trial
+BACKUP_DIR = "/ota_backup"  # Live files replaced by the install being tried
+FAILED_FILE = "/ota_failed.json"  # Last version that was rolled back, so it is not installed again
+MAX_TRIAL_BOOTS = 2  # Boots a new firmware gets to mark itself healthy before it is rolled back
+HEALTH_TIMEOUT_MS = 10 * 60 * 1000  # Trial boots that are not healthy by then are reset
+
+_watchdog = None
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def _parent(path):
+    return path[:path.rfind("/")] if "/" in path else ""
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save(path, data):
+    # Write a temporary file and rename it, so a power cut leaves either the old or the new journal.
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.rename(path + ".tmp", path)
+
+
+def _move(src, dst):
+    if _parent(dst):
+        tarstream.makedirs(_parent(dst))
+    try:
+        os.rename(src, dst)
+    except OSError:
+        os.remove(dst)  # Filesystems that do not replace on rename
+        os.rename(src, dst)
+
+
+def install(staging_dir, staged, version):
+    """Swap the files staged in staging_dir over the live ones, keeping the old ones for a rollback.
+
+    staged is [(name, size)] as returned by tarstream.extract(). Every staged
+    file is checked against its size before anything live is touched. A
+    journal records each step: a power cut during the swap is rolled back at
+    the next boot, and afterwards the new firmware runs on trial until
+    mark_healthy() is called. Returns True once the swap is done.
+    """
+    if on_trial():
+        print("Current firmware is still on trial, not installing another one.")
+        return False
+    for name, size in staged:
+        if os.stat(f"{staging_dir}/{name}")[6] != size:
+            print(f"Staged {name} does not have the expected size, not installing.")
+            return False
+    names = [name for name, _ in staged]
+    tarstream.remove_tree(BACKUP_DIR)
+    os.mkdir(BACKUP_DIR)
+    journal = {
+        "state": "installing",
+        "version": version,
+        "files": names,
+        "new": [name for name in names if not _exists(name)],  # Nothing to restore, delete on rollback
+        "boots": 0,
+    }
+    _save(JOURNAL, journal)
+    for name in names:
+        if name not in journal["new"]:
+            _move(name, f"{BACKUP_DIR}/{name}")
+        _move(f"{staging_dir}/{name}", name)
+    journal["state"] = "trial"
+    _save(JOURNAL, journal)
+    tarstream.remove_tree(staging_dir)
+    return True
+
+
+def rollback(journal, failed=True):
+    """Put back the files an install replaced and forget the install.
+
+    Unless failed is False (the install was only interrupted), the version is
+    recorded so the updater does not fetch it again.
+    """
+    print(f"Rolling back firmware version {journal.get('version')}...")
+    for name in journal["files"]:
+        backup = f"{BACKUP_DIR}/{name}"
+        if _exists(backup):
+            _move(backup, name)
+        elif name in journal["new"] and _exists(name):
+            os.remove(name)
+    if failed:
+        _save(FAILED_FILE, {"version": journal.get("version")})
+    os.remove(JOURNAL)
+    tarstream.remove_tree(BACKUP_DIR)
+    print("Rollback complete.")
+
+
+def failed_version():
+    """Version of the last firmware that was rolled back, or None."""
+    failed = _load(FAILED_FILE)
+    return failed.get("version") if failed else None
+
+
+def on_trial():
+    journal = _load(JOURNAL)
+    return journal is not None and journal["state"] == "trial"
+
+
+def boot_check():
+    """Run first thing in boot.py: finish or undo an interrupted install and police trial boots.
+
+    An install cut short by a reset is rolled back. A firmware on trial that
+    has already used MAX_TRIAL_BOOTS boots without calling mark_healthy() is
+    rolled back and the board reset into the old firmware; otherwise the boot
+    is counted and a one-shot timer resets the board if mark_healthy() has
+    not been called within HEALTH_TIMEOUT_MS.
+    """
+    global _watchdog
+    journal = _load(JOURNAL)
+    if journal is None:
+        return
+    if journal["state"] == "installing":
+        print("Found an interrupted firmware install.")
+        rollback(journal, failed=False)
+        machine.reset()
+    if journal["boots"] >= MAX_TRIAL_BOOTS:
+        print(f"Firmware version {journal.get('version')} never reported healthy.")
+        rollback(journal)
+        machine.reset()
+    journal["boots"] += 1
+    _save(JOURNAL, journal)
+    print(f"Firmware version {journal.get('version')} on trial, boot {journal['boots']}/{MAX_TRIAL_BOOTS}.")
+    _watchdog = machine.Timer(0)
+    _watchdog.init(mode=machine.Timer.ONE_SHOT, period=HEALTH_TIMEOUT_MS, callback=lambda t: machine.reset())
+
+
+def mark_healthy():
+    """Called by main.py once the new firmware works: keep it and drop the backup."""
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.deinit()
+        _watchdog = None
+    journal = _load(JOURNAL)
+    if journal is None or journal["state"] != "trial":
+        return
+    os.remove(JOURNAL)
+    tarstream.remove_tree(BACKUP_DIR)
+    print(f"Firmware version {journal.get('version')} marked healthy.")
@@ -0,0 +1,196 @@
+import time
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+# Binary telemetry payload, version 1 (all fields little-endian):
+#   header   B version, B status bits, B node id, H sequence, H firmware version, I unix time
+#   values   H acc RMS X/Y/Z in 0.1 mg, H velocity RMS X/Y/Z in 0.01 mm/s, B RTD channel count
+#   channels h temperature in 0.01 C, B MAX31865 fault status; once per RTD channel
+# tools/telemetry_decoder.py decodes it on the host; tests/test_telemetry.py checks the two round-trip.
+VERSION = 1
+HEADER_FORMAT = "<BBBHHI"
+VALUES_FORMAT = "<HHHHHHB"
+CHANNEL_FORMAT = "<hB"
+HEADER_SIZE = 11
+VALUES_SIZE = 13
+CHANNEL_SIZE = 3
+
+# Status bits
+STATUS_ACCEL = 0x01  # Acceleration values are valid
+STATUS_VELOCITY = 0x02  # Velocity values are valid (window captured at a known rate)
+STATUS_TEMPERATURE = 0x04  # Channel 0 temperature is valid
+STATUS_CLOCK = 0x08  # Timestamp comes from an NTP-synced clock
+
+TEMP_INVALID = -32768  # Channel temperature when the channel is faulted
+
+
+def _u16(value, scale):
+    value = int(value * scale + 0.5)
+    return 0 if value < 0 else 0xFFFF if value > 0xFFFF else value
+
+
+class TelemetryEncoder:
+    """Builds binary telemetry payloads into one buffer that is reused for every message."""
+
+    def __init__(self, node_id, max_channels=8):
+        self.node_id = node_id
+        self.max_channels = max_channels
+        self.seq = 0
+        self._buf = bytearray(HEADER_SIZE + VALUES_SIZE + CHANNEL_SIZE * max_channels)
+        self._view = memoryview(self._buf)
+
+    def encode(self, status, firmware_version, timestamp, acc, vel, temps, faults):
+        """Pack one reading and return a memoryview of the payload, valid until the next call.
+
+        acc and vel are (x, y, z) tuples or None; temps holds centi-degrees (or
+        None) and faults the fault status byte for each RTD channel.
+        """
+        buf = self._buf
+        channels = min(len(temps), self.max_channels)
+        self.seq = (self.seq + 1) & 0xFFFF
+        struct.pack_into(HEADER_FORMAT, buf, 0, VERSION, status, self.node_id & 0xFF, self.seq,
+                         firmware_version & 0xFFFF, timestamp & 0xFFFFFFFF)
+        ax, ay, az = acc if acc is not None else (0, 0, 0)
+        vx, vy, vz = vel if vel is not None else (0, 0, 0)
+        struct.pack_into(VALUES_FORMAT, buf, HEADER_SIZE, _u16(ax, 10000), _u16(ay, 10000), _u16(az, 10000),
+                         _u16(vx, 100), _u16(vy, 100), _u16(vz, 100), channels)
+        offset = HEADER_SIZE + VALUES_SIZE
+        for i in range(channels):
+            t = temps[i]
+            if t is None or t < -32767 or t > 32767:
+                t = TEMP_INVALID
+            struct.pack_into(CHANNEL_FORMAT, buf, offset, t, faults[i])
+            offset += CHANNEL_SIZE
+        return self._view[:offset]
+
+
+# Batch frame, several readings in one MQTT message (little-endian):
+#   header  B BATCH_VERSION, B record count, I unix time of the first record
+#   records H milliseconds since the first record, B record length, record bytes; once per record
+# Records are binary payloads as above. Text readings are batched as lines instead,
+# each ending in ", TS: <unix time>, MS: <milliseconds since the first line>".
+BATCH_VERSION = 0x81
+BATCH_HEADER_FORMAT = "<BBI"
+BATCH_RECORD_FORMAT = "<HB"
+BATCH_HEADER_SIZE = 6
+BATCH_RECORD_SIZE = 3
+
+
+class TelemetryBatch:
+    """Collects up to max_records readings and hands them out as one frame.
+
+    due() turns true once max_records readings are held or the oldest one is
+    max_age_ms old, whichever comes first, so batching never delays a reading
+    by more than max_age_ms plus one cycle. The frame buffer is allocated
+    once; record_size bounds a single reading (longer ones are cut).
+    """
+
+    def __init__(self, max_records, max_age_ms, record_size, text=False):
+        self.max_records = max_records
+        self.max_age_ms = max_age_ms
+        self.record_size = min(record_size, 255)
+        self.text = text
+        self._buf = bytearray(BATCH_HEADER_SIZE + max_records * (BATCH_RECORD_SIZE + self.record_size))
+        self._view = memoryview(self._buf)
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self._len = BATCH_HEADER_SIZE
+        self._first_ms = 0
+        self._first_time = 0
+
+    def add(self, payload, timestamp):
+        """Append one reading taken at unix time timestamp; returns False if the batch is already full."""
+        if self.count >= self.max_records:
+            return False
+        now = time.ticks_ms()
+        if self.count == 0:
+            self._first_ms = now
+            self._first_time = timestamp
+        offset = min(time.ticks_diff(now, self._first_ms), 0xFFFF)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        length = min(len(payload), self.record_size)
+        pos = self._len
+        struct.pack_into(BATCH_RECORD_FORMAT, self._buf, pos, offset, length)
+        pos += BATCH_RECORD_SIZE
+        self._buf[pos:pos + length] = payload[:length]
+        self._len = pos + length
+        self.count += 1
+        return True
+
+    def due(self):
+        if self.count >= self.max_records:
+            return True
+        return self.count > 0 and time.ticks_diff(time.ticks_ms(), self._first_ms) >= self.max_age_ms
+
+    def records(self):
+        """Yield (timestamp, payload) for every held reading, payload being a memoryview into the batch."""
+        pos = BATCH_HEADER_SIZE
+        for _ in range(self.count):
+            offset, length = struct.unpack_from(BATCH_RECORD_FORMAT, self._buf, pos)
+            pos += BATCH_RECORD_SIZE
+            yield self._first_time + offset // 1000, self._view[pos:pos + length]
+            pos += length
+
+    def frame(self):
+        """Return the batch as one payload: a binary frame, or newline-separated lines in text mode."""
+        if self.text:
+            lines = []
+            pos = BATCH_HEADER_SIZE
+            for _ in range(self.count):
+                offset, length = struct.unpack_from(BATCH_RECORD_FORMAT, self._buf, pos)
+                pos += BATCH_RECORD_SIZE
+                lines.append(bytes(self._view[pos:pos + length]) + f", TS: {self._first_time}, MS: {offset}".encode())
+                pos += length
+            return b"\n".join(lines)
+        struct.pack_into(BATCH_HEADER_FORMAT, self._buf, 0, BATCH_VERSION, self.count, self._first_time & 0xFFFFFFFF)
+        return self._view[:self._len]
+
+
+class Deadband:
+    """Report-by-exception filter for a fixed set of metrics.
+
+    check() is given the current value of every metric (None when it is
+    unavailable) and says whether to publish: on the first reading, when any
+    metric moved more than its deadband away from the last published value,
+    when a metric became available or unavailable, or when nothing was
+    published for heartbeat_ms. The published and suppressed counters show
+    how much traffic the deadbands save.
+    """
+
+    def __init__(self, deadbands, heartbeat_ms):
+        self.deadbands = deadbands
+        self.heartbeat_ms = heartbeat_ms
+        self._last = [None] * len(deadbands)
+        self._last_ms = 0
+        self.published = 0
+        self.suppressed = 0
+        self.heartbeats = 0  # Publishes forced by the heartbeat alone
+
+    def check(self, values):
+        """Return True if values should be published, and remember them if so."""
+        now = time.ticks_ms()
+        changed = self.published == 0
+        last = self._last
+        for i in range(len(last)):
+            value = values[i]
+            if changed:
+                break
+            if (value is None) != (last[i] is None):
+                changed = True
+            elif value is not None and abs(value - last[i]) > self.deadbands[i]:
+                changed = True
+        if not changed:
+            if time.ticks_diff(now, self._last_ms) < self.heartbeat_ms:
+                self.suppressed += 1
+                return False
+            self.heartbeats += 1
+        for i in range(len(last)):
+            last[i] = values[i]
+        self._last_ms = now
+        self.published += 1
+        return True
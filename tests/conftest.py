@@ -0,0 +1,26 @@
+# Host-side tests: run with desktop Python from the repo root (python -m pytest tests).
+# The firmware modules import MicroPython-only modules, so minimal stand-ins are installed here.
+import asyncio
+import binascii
+import os
+import struct
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+sys.modules.setdefault("ustruct", struct)
+sys.modules.setdefault("ubinascii", binascii)
+sys.modules.setdefault("uasyncio", asyncio)
+sys.modules.setdefault("micropython", types.SimpleNamespace(const=lambda x: x))
+if not hasattr(asyncio, "sleep_ms"):
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+sys.modules.setdefault("network", types.SimpleNamespace(STAT_WRONG_PASSWORD=202, STAT_NO_AP_FOUND=201))
+if not hasattr(os, "ilistdir"):
+    os.ilistdir = lambda path: ((e.name, 0x4000 if e.is_dir() else 0x8000, 0) for e in os.scandir(path))
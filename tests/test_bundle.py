@@ -0,0 +1,118 @@
+import binascii
+import io
+import os
+import sys
+import tarfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+import bundle
+import pack_firmware
+import tarstream
+
+KEY = b"shared-ota-key"
+VERSION = 7
+
+
+@pytest.fixture
+def firmware(tmp_path):
+    # A node folder with a nested file, as pack_firmware.bundle_files() would list it.
+    src = tmp_path / "node"
+    (src / "lib").mkdir(parents=True)
+    (src / "main.py").write_bytes(b"NODE_ID = 6\n" * 50)
+    (src / "lib" / "util.py").write_bytes(b"def f():\n    return 1\n")
+    return [(str(src / "main.py"), "main.py"), (str(src / "lib" / "util.py"), "lib/util.py")]
+
+
+def pack(files, manifest_files=None, version=VERSION, key=None, signature=None):
+    manifest = pack_firmware.build_manifest(manifest_files if manifest_files is not None else files, version)
+    members = [(bundle.MANIFEST, manifest)]
+    if signature is None and key is not None:
+        signature = binascii.hexlify(bundle.hmac_sha256(key, manifest))
+    if signature is not None:
+        members.append((bundle.SIGNATURE, signature))
+    return pack_firmware.build_tar(files, members)
+
+
+def stage(tmp_path, tar, version=VERSION):
+    # What ota.fetch_firmware() does with the stream: extract with hashing, then verify.
+    dest = tmp_path / "stage"
+    tarstream.remove_tree(str(dest))
+    dest.mkdir()
+    hashes = {}
+    staged = tarstream.extract(io.BytesIO(tar), str(dest), bytearray(1024), hashes)
+    return bundle.verify(str(dest), staged, hashes, version)
+
+
+@pytest.fixture
+def key_file(tmp_path, monkeypatch):
+    path = tmp_path / "ota.key"
+    path.write_bytes(KEY + b"\n")
+    monkeypatch.setattr(bundle, "KEY_FILE", str(path))
+
+
+@pytest.fixture(autouse=True)
+def no_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(bundle, "KEY_FILE", str(tmp_path / "absent.key"))
+
+
+def test_good_bundle_is_accepted(tmp_path, firmware):
+    staged = stage(tmp_path, pack(firmware))
+    assert sorted(staged) == [("lib/util.py", 22), ("main.py", 600)]
+
+
+def test_tampered_member_is_rejected(tmp_path, firmware):
+    manifest_files = firmware
+    tampered = tmp_path / "tampered.py"
+    tampered.write_bytes(b"NODE_ID = 9\n" * 50)  # Same size, different bytes
+    tar = pack([(str(tampered), "main.py"), firmware[1]], manifest_files=manifest_files)
+    with pytest.raises(ValueError, match="SHA-256"):
+        stage(tmp_path, tar)
+
+
+def test_truncated_stream_is_rejected(tmp_path, firmware):
+    tar = pack(firmware)
+    with tarfile.open(fileobj=io.BytesIO(tar)) as archive:
+        last = archive.getmembers()[-1]
+    end = last.offset_data + -(-last.size // 512) * 512
+    for cut in (len(tar) // 8, end):  # Inside a member, and at a member boundary without the end-of-archive block
+        with pytest.raises(ValueError, match="end of tar"):
+            stage(tmp_path, tar[:cut])
+
+
+def test_unlisted_file_is_rejected(tmp_path, firmware):
+    with pytest.raises(ValueError, match="not in the manifest"):
+        stage(tmp_path, pack(firmware, manifest_files=firmware[:1]))
+
+
+def test_missing_file_is_rejected(tmp_path, firmware):
+    with pytest.raises(ValueError, match="missing"):
+        stage(tmp_path, pack(firmware[:1], manifest_files=firmware))
+
+
+def test_wrong_version_is_rejected(tmp_path, firmware):
+    with pytest.raises(ValueError, match="version"):
+        stage(tmp_path, pack(firmware, version=VERSION - 1))
+
+
+def test_bundle_without_manifest_is_rejected(tmp_path, firmware):
+    with pytest.raises(ValueError, match="no manifest"):
+        stage(tmp_path, pack_firmware.build_tar(firmware))
+
+
+def test_signed_bundle_is_accepted_with_key(tmp_path, firmware, key_file):
+    assert len(stage(tmp_path, pack(firmware, key=KEY))) == 2
+
+
+def test_unsigned_bundle_is_rejected_with_key(tmp_path, firmware, key_file):
+    with pytest.raises(ValueError, match="not signed"):
+        stage(tmp_path, pack(firmware))
+
+
+def test_bad_signature_is_rejected(tmp_path, firmware, key_file):
+    with pytest.raises(ValueError, match="signature"):
+        stage(tmp_path, pack(firmware, key=b"some other key"))
+    with pytest.raises(ValueError, match="signature"):
+        stage(tmp_path, pack(firmware, signature=b"00" * 32))
@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+import types
+
+import pytest
+
+
+class Reset(Exception):
+    """machine.reset() never returns on the board; here it unwinds the test instead."""
+
+
+class Timer:
+    ONE_SHOT = 0
+    started = []
+
+    def __init__(self, timer_id):
+        self.running = False
+
+    def init(self, mode, period, callback):
+        self.running = True
+        Timer.started.append(self)
+
+    def deinit(self):
+        self.running = False
+
+
+def _reset():
+    raise Reset()
+
+
+sys.modules.setdefault("machine", types.SimpleNamespace())
+
+import installer
+
+
+@pytest.fixture(autouse=True)
+def node(tmp_path, monkeypatch):
+    # Live files in the working directory, installer state next to them instead of in /.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(installer, "machine", types.SimpleNamespace(reset=_reset, Timer=Timer))
+    monkeypatch.setattr(installer, "JOURNAL", str(tmp_path / "ota_journal.json"))
+    monkeypatch.setattr(installer, "BACKUP_DIR", str(tmp_path / "ota_backup"))
+    monkeypatch.setattr(installer, "FAILED_FILE", str(tmp_path / "ota_failed.json"))
+    monkeypatch.setattr(installer, "_watchdog", None)
+    Timer.started = []
+    write("main.py", "old main")
+    write("util.py", "old util")
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def stage_update():
+    os.mkdir("stage")
+    files = {"main.py": "new main", "extra.py": "new file", "util.py": "new util"}
+    for name, text in files.items():
+        write(f"stage/{name}", text)
+    return [(name, len(text)) for name, text in files.items()]
+
+
+def test_interrupted_install_is_rolled_back(monkeypatch):
+    staged = stage_update()
+    real_move = installer._move
+    moves = []
+
+    def move(src, dst):
+        moves.append(src)
+        if len(moves) == 4:  # Power cut while backing up util.py, after extra.py went live
+            raise Reset()
+        real_move(src, dst)
+
+    monkeypatch.setattr(installer, "_move", move)
+    with pytest.raises(Reset):
+        installer.install("stage", staged, 8)
+    monkeypatch.setattr(installer, "_move", real_move)
+    assert os.path.exists("extra.py") and read("main.py") == "new main"
+
+    with pytest.raises(Reset):  # Next boot
+        installer.boot_check()
+    assert read("main.py") == "old main"
+    assert read("util.py") == "old util"
+    assert not os.path.exists("extra.py")  # New in the update, so deleted
+    assert not os.path.exists(installer.JOURNAL)
+    assert not os.path.exists(installer.BACKUP_DIR)
+    assert installer.failed_version() is None  # Only interrupted, it may be tried again
+
+
+def test_trial_that_never_reports_healthy_is_rolled_back():
+    assert installer.install("stage", stage_update(), 8)
+    assert read("main.py") == "new main" and installer.on_trial()
+    for boot in range(installer.MAX_TRIAL_BOOTS):
+        installer.boot_check()  # Watchdog armed, new firmware runs
+        assert json.load(open(installer.JOURNAL))["boots"] == boot + 1
+    assert len(Timer.started) == installer.MAX_TRIAL_BOOTS
+
+    with pytest.raises(Reset):
+        installer.boot_check()
+    assert read("main.py") == "old main"
+    assert read("util.py") == "old util"
+    assert not os.path.exists("extra.py")
+    assert json.load(open(installer.FAILED_FILE)) == {"version": 8}
+    assert installer.failed_version() == 8
+    assert not installer.on_trial()
+
+
+def test_mark_healthy_keeps_the_update():
+    assert installer.install("stage", stage_update(), 8)
+    installer.boot_check()
+    watchdog = Timer.started[-1]
+    installer.mark_healthy()
+    assert not watchdog.running
+    assert not os.path.exists(installer.JOURNAL)
+    assert not os.path.exists(installer.BACKUP_DIR)
+    assert read("main.py") == "new main" and read("extra.py") == "new file"
+    installer.boot_check()  # Nothing left to police
+    assert len(Timer.started) == 1
+
+
+def test_install_refuses_while_on_trial():
+    assert installer.install("stage", stage_update(), 8)
+    assert not installer.install("stage", stage_update(), 9)
+    assert read("main.py") == "new main"
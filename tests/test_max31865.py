@@ -0,0 +1,116 @@
+import asyncio
+
+import max31865
+
+# (rtd_nominal, ref_resistor): PT100 on our boards, PT100 on the stock breakout, PT1000
+LUT_COMBINATIONS = ((100.0, 402.0), (100.0, 430.0), (1000.0, 4300.0))
+LUT_MAX_ERROR_C = 0.05
+# Codes outside -200 C .. 850 C are not physical for a platinum RTD.
+T_MIN_C = -200.0
+T_MAX_C = 850.0
+RTD_100C = round(138.51 / 430.0 * 32768)  # 15-bit code of a PT100 at 100 C with a 430 Ohm reference
+
+
+class FakeChip:
+    """MAX31865 register file behind a fake SPI bus and chip select."""
+
+    def __init__(self):
+        self.regs = bytearray(8)
+        self.fault_clears = 0
+
+    # Chip select pin
+    def value(self, v):
+        pass
+
+    # SPI bus
+    def write(self, buf):
+        address = buf[0] & 0x7F
+        if buf[0] & 0x80 and address == 0:
+            if buf[1] & 0x02:  # Fault status clear
+                self.regs[7] = 0
+                self.fault_clears += 1
+            self.regs[0] = buf[1] & ~0x22  # 1-shot and fault clear bits clear themselves
+        elif buf[0] & 0x80:
+            self.regs[address] = buf[1]
+
+    def write_readinto(self, tx, rx):
+        address = tx[0] & 0x7F
+        for i in range(1, len(tx)):
+            rx[i] = self.regs[address + i - 1]
+
+    def convert(self, code, fault=0):
+        # One auto conversion: the fault status latches until cleared.
+        self.regs[1] = code >> 7
+        self.regs[2] = (code << 1) & 0xFF | (1 if fault or self.regs[7] else 0)
+        self.regs[7] |= fault
+
+
+def continuous_scanner():
+    chip = FakeChip()
+    sensor = max31865.MAX31865(chip, chip, ref_resistor=430.0, lookup_table=True)
+    sensor.set_continuous(True)
+    sensor._ready_ms = 0
+    return chip, max31865.RTDScanner([sensor])
+
+
+def test_transient_fault_is_cleared_and_not_reported():
+    chip, scanner = continuous_scanner()
+    chip.convert(RTD_100C, fault=0x80)  # EMI spike on the leads
+    real_sleep = asyncio.sleep_ms
+
+    async def next_conversion(ms):
+        chip.convert(RTD_100C)  # The next conversion is clean
+        await real_sleep(0)
+
+    max31865.asyncio.sleep_ms = next_conversion
+    try:
+        asyncio.run(scanner.scan())
+    finally:
+        max31865.asyncio.sleep_ms = real_sleep
+    assert chip.fault_clears == 1
+    assert scanner.faults[0] == 0
+    assert abs(scanner.temperature(0) - 100) < 0.5
+    chip.convert(RTD_100C)
+    asyncio.run(scanner.scan())  # Not latched any more
+    assert scanner.faults[0] == 0 and chip.fault_clears == 1
+
+
+def test_persistent_fault_is_reported():
+    chip, scanner = continuous_scanner()
+    chip.convert(0, fault=0x04)
+    real_sleep = asyncio.sleep_ms
+
+    async def next_conversion(ms):
+        chip.convert(0, fault=0x04)  # Still shorted
+        await real_sleep(0)
+
+    max31865.asyncio.sleep_ms = next_conversion
+    try:
+        asyncio.run(scanner.scan())
+    finally:
+        max31865.asyncio.sleep_ms = real_sleep
+    assert scanner.faults[0] == 0x04
+    assert scanner.temperature(0) is None
+
+
+def lut_max_error(rtd_nominal, ref_resistor):
+    """Worst |lookup table - Callendar-Van Dusen| in C over every physical 15-bit code, its code, and the table size."""
+    chip = FakeChip()
+    sensor = max31865.MAX31865(chip, chip, rtd_nominal=rtd_nominal, ref_resistor=ref_resistor, lookup_table=True)
+    worst = 0.0
+    worst_code = 0
+    for code in range(32768):
+        exact = max31865._cvd_temperature(code * ref_resistor / 32768, rtd_nominal)
+        if not T_MIN_C <= exact <= T_MAX_C:
+            continue
+        error = abs(sensor.rtd_to_centidegrees(code) / 100 - exact)
+        if error > worst:
+            worst = error
+            worst_code = code
+    return worst, worst_code, len(sensor._lut)
+
+
+def test_lookup_table_error():
+    for rtd_nominal, ref_resistor in LUT_COMBINATIONS:
+        worst, code, _ = lut_max_error(rtd_nominal, ref_resistor)
+        assert worst <= LUT_MAX_ERROR_C, f"R0={rtd_nominal:g} Rref={ref_resistor:g}: {worst:.4f} C at code {code}"
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+
+import telemetry
+import telemetry_decoder
+
+ALL_VALID = telemetry.STATUS_ACCEL | telemetry.STATUS_VELOCITY | telemetry.STATUS_TEMPERATURE | telemetry.STATUS_CLOCK
+
+
+def test_reading_round_trip():
+    encoder = telemetry.TelemetryEncoder(6)
+    payload = encoder.encode(ALL_VALID, 12, 1700000000, (0.0123, 0.0456, 1.0002), (1.23, 4.56, 0.07),
+                             [2345, -1050], [0, 0])
+    reading = telemetry_decoder.decode(payload)
+    assert reading["version"] == telemetry.VERSION
+    assert (reading["node"], reading["seq"], reading["fw"], reading["ts"]) == (6, 1, 12, 1700000000)
+    assert reading["clock_synced"]
+    assert reading["acc"] == pytest.approx((0.0123, 0.0456, 1.0002), abs=0.00005)
+    assert reading["vel"] == pytest.approx((1.23, 4.56, 0.07), abs=0.005)
+    assert reading["temp"] == 23.45
+    assert reading["rtd"] == [{"temp": 23.45, "fault": 0}, {"temp": -10.5, "fault": 0}]
+
+
+def test_reading_without_accel_or_velocity():
+    encoder = telemetry.TelemetryEncoder(3)
+    payload = encoder.encode(telemetry.STATUS_TEMPERATURE, 1, 42, None, None, [1999], [0])
+    reading = telemetry_decoder.decode(payload)
+    assert reading["acc"] is None
+    assert reading["vel"] is None
+    assert reading["temp"] == 19.99
+    assert not reading["clock_synced"]
+
+
+def test_faulted_channel():
+    encoder = telemetry.TelemetryEncoder(6)
+    payload = encoder.encode(telemetry.STATUS_ACCEL | telemetry.STATUS_VELOCITY, 1, 42, (0.01, 0.01, 1.0),
+                             (0.5, 0.5, 0.5), [None, 2500], [0x84, 0])
+    reading = telemetry_decoder.decode(payload)
+    assert reading["temp"] is None  # STATUS_TEMPERATURE is clear when channel 0 is faulted
+    assert reading["rtd"] == [{"temp": None, "fault": 0x84}, {"temp": 25.0, "fault": 0}]
+
+
+def test_batch_frame_round_trip():
+    encoder = telemetry.TelemetryEncoder(6)
+    batch = telemetry.TelemetryBatch(3, 10000, 64)
+    for i in range(3):
+        payload = encoder.encode(ALL_VALID, 12, 1700000000 + i, (0.01 * i, 0.0, 1.0), (0.1 * i, 0.0, 0.0),
+                                 [2000 + i], [0])
+        assert batch.add(payload, 1700000000 + i)
+    assert batch.due()
+    frame = telemetry_decoder.decode(batch.frame())
+    assert frame["ts"] == 1700000000
+    assert [r["seq"] for r in frame["batch"]] == [1, 2, 3]
+    assert [r["temp"] for r in frame["batch"]] == [20.0, 20.01, 20.02]
+    assert [r["vel"][0] for r in frame["batch"]] == pytest.approx([0.0, 0.1, 0.2])
+    assert all(r["ms"] >= 0 for r in frame["batch"])
+
+
+def test_text_batch_frame():
+    batch = telemetry.TelemetryBatch(2, 10000, 64, text=True)
+    batch.add("N6, Temp: 20.0C", 1700000000)
+    batch.add("N6, Temp: 20.1C", 1700000002)
+    frame = telemetry_decoder.decode(batch.frame())
+    assert [r["text"].split(", TS")[0] for r in frame["batch"]] == ["N6, Temp: 20.0C", "N6, Temp: 20.1C"]
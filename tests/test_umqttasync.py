@@ -0,0 +1,100 @@
+import asyncio
+import errno
+
+import umqttasync
+
+
+class Broker:
+    """Just enough of an MQTT broker: CONNACK, PUBACK, and a count of each payload received."""
+
+    def __init__(self):
+        self.received = {}
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                op = (await reader.readexactly(1))[0]
+                n = (await reader.readexactly(1))[0]
+                body = await reader.readexactly(n)
+                if op & 0xF0 == 0x10:
+                    writer.write(b"\x20\x02\0\0")
+                elif op & 0xF0 == 0x30:
+                    topic_len = (body[0] << 8) | body[1]
+                    pid = body[2 + topic_len:4 + topic_len]
+                    payload = bytes(body[4 + topic_len:])
+                    self.received[payload] = self.received.get(payload, 0) + 1
+                    writer.write(b"\x40\x02" + pid)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+
+class BrokenWriter:
+    """Stands in for the stream writer of a link that has just dropped."""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def write(self, data):
+        raise OSError(errno.ECONNRESET, "link dropped")
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.writer.close()
+
+
+def test_failed_publish_is_delivered_once_after_reconnect():
+    async def run():
+        broker = Broker()
+        await broker.start()
+        client = umqttasync.MQTTClient(b"test", "127.0.0.1", port=broker.port, timeout=2)
+        await client.connect(clean_session=False)
+        backlog = []
+        client.writer = BrokenWriter(client.writer)
+        try:
+            await client.publish(b"OC7/data/N0", b"reading", qos=1)
+        except OSError:
+            backlog.append(b"reading")  # What main.py does with a reading it could not publish
+        assert client.inflight == 0
+        await client.connect(clean_session=False)
+        for payload in backlog:  # backlog_task
+            await client.publish(b"OC7/data/N0", payload, qos=1)
+        await client.flush()
+        await client.disconnect()
+        broker.server.close()
+        return broker.received
+
+    assert asyncio.run(run()) == {b"reading": 1}
+
+
+def test_publish_while_disconnected_is_a_link_error():
+    import link
+
+    client = umqttasync.MQTTClient(b"test", "127.0.0.1")
+    try:
+        asyncio.run(client.publish(b"OC7/data/N0", b"reading", qos=1))
+    except OSError as e:
+        assert e.errno == errno.ENOTCONN
+        assert link.classify(e) == link.LINK
+    else:
+        raise AssertionError("publish without a connection did not raise")
+    assert client.inflight == 0  # Left to the caller, as for any failed write
+
+
+def test_wait_msg_reports_a_lost_connection_like_check_msg():
+    client = umqttasync.MQTTClient(b"test", "127.0.0.1")
+    assert client.wait_msg() is None
+    client._lost(OSError(errno.ECONNRESET, "link dropped"))
+    for call in (client.check_msg, client.wait_msg):
+        try:
+            call()
+        except OSError:
+            pass
+        else:
+            raise AssertionError(f"{call.__name__} did not report the lost connection")
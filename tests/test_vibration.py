@@ -0,0 +1,46 @@
+import math
+
+import vibration
+
+SAMPLE_RATE = 1000
+WINDOW = 512
+
+
+def tone_rms(freq, velocity_rms, samples=WINDOW):
+    # Acceleration tone, in g, whose integral has the given velocity RMS in mm/s; z carries gravity.
+    amplitude = velocity_rms * math.sqrt(2) * 2 * math.pi * freq / vibration.G_MM_S2
+    velocity = vibration.VelocityRMS(SAMPLE_RATE, 10.0)
+    for n in range(samples):
+        a = amplitude * math.cos(2 * math.pi * freq * n / SAMPLE_RATE)
+        velocity.add(a, 0.5 * a, 1.0 + a)
+    return velocity.rms()
+
+
+def test_velocity_running_speed_in_band():
+    # 25 Hz is 1x running speed on the monitored motors, well inside the ~10-184 Hz band the node measures.
+    x, y, z = tone_rms(25, 2.21)
+    assert abs(x - 2.21) / 2.21 < 0.03
+    assert abs(y - 1.105) / 1.105 < 0.03
+    assert abs(z - 2.21) / 2.21 < 0.03  # Gravity is removed
+
+
+def test_velocity_band_edge():
+    # One second-order edge: about -3 dB at the cutoff, not the -6 dB of two stacked first-order stages.
+    x, _, _ = tone_rms(10, 2.0, samples=4096)
+    assert 0.65 < x / 2.0 < 0.75
+
+
+def test_velocity_short_window():
+    assert vibration.VelocityRMS(SAMPLE_RATE).rms() is None
+
+
+def test_bands_above_sensor_bandwidth_are_null():
+    spectrum = vibration.Spectrum(WINDOW, SAMPLE_RATE)
+    spectrum.max_hz = 184  # MPU6050 DLPF_CFG 1
+    for n in range(WINDOW):
+        spectrum.add(math.sin(2 * math.pi * 125 * n / SAMPLE_RATE))
+    spectrum.compute()
+    in_band, above_dlpf, above_nyquist = spectrum.features(((100.0, 180.0), (200.0, 500.0), (1000.0, 5000.0)))
+    assert abs(in_band - math.sqrt(0.5)) < 0.05
+    assert above_dlpf is None
+    assert above_nyquist is None
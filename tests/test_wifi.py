@@ -0,0 +1,70 @@
+import wifi
+
+BSSID_NEAR = b"\x01\x02\x03\x04\x05\x06"
+BSSID_FAR = b"\x0a\x0b\x0c\x0d\x0e\x0f"
+
+
+class FakeWLAN:
+    """Station interface that records every association and connects at once."""
+
+    def __init__(self, reachable=(BSSID_NEAR, BSSID_FAR)):
+        self.reachable = reachable
+        self.connects = []
+        self.scans = 0
+        self.channel = None
+        self._connected = False
+
+    def active(self, value=None):
+        return True
+
+    def disconnect(self):
+        self._connected = False
+
+    def ifconfig(self, config=None):
+        return ("192.168.1.50", "255.255.255.0", "192.168.1.1", "192.168.1.1")
+
+    def scan(self):
+        self.scans += 1
+        return [(b"plant", BSSID_FAR, 1, -80, 3, False), (b"office", b"\xff" * 6, 11, -30, 3, False),
+                (b"plant", BSSID_NEAR, 6, -50, 3, False)]
+
+    def config(self, **kwargs):
+        self.channel = kwargs.get("channel", self.channel)
+
+    def connect(self, ssid, password, bssid=None):
+        self.connects.append(bssid)
+        self._connected = bssid is None or bssid in self.reachable
+
+    def isconnected(self):
+        return self._connected
+
+    def status(self):
+        return 0
+
+
+def test_boot_connect_caches_strongest_access_point(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    wlan = FakeWLAN()
+    assert wifi.connect(wlan, "plant", "pw")
+    assert wlan.scans == 1
+    assert wlan.connects == [BSSID_NEAR]
+    assert wifi.load()["bssid"] == BSSID_NEAR.hex() and wifi.load()["channel"] == 6
+
+    # The second connect, at the next boot or from the link supervisor, goes out directed without a scan.
+    wlan = FakeWLAN()
+    assert wifi.connect(wlan, "plant", "pw")
+    assert wlan.scans == 0
+    assert wlan.connects == [BSSID_NEAR] and wlan.channel == 6
+    wlan = FakeWLAN()
+    assert wifi.start(wlan, "plant", "pw") == (BSSID_NEAR, 6)
+    assert wlan.connects == [BSSID_NEAR] and wlan.scans == 0
+
+
+def test_dead_cached_access_point_is_rescanned(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wifi, "DIRECTED_TIMEOUT_MS", 0)
+    wifi.remember((b"\xee" * 6, 11))  # Replaced since the last boot
+    wlan = FakeWLAN()
+    assert wifi.connect(wlan, "plant", "pw")
+    assert wlan.connects == [b"\xee" * 6, BSSID_NEAR]
+    assert wifi.load()["bssid"] == BSSID_NEAR.hex()
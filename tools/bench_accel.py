@@ -0,0 +1,92 @@
+"""
+Host-side benchmark for the MPU6050 acquisition path.
+
+Runs the old per-axis read_i2c_word() path and the burst read in mpu6050.py
+against a fake I2C bus and prints samples/second for each. The fake bus also
+charges the wire time a 400 kHz bus would need for every transaction, so the
+"bus-limited" figure is what to expect on the ESP32 once the interpreter is
+no longer the bottleneck.
+
+    python tools/bench_accel.py [num_samples]
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mpu6050
+
+I2C_FREQ = 400000
+BITS_PER_BYTE = 9  # 8 data bits + ACK
+
+
+class FakeI2C:
+    """Answers register reads from a fixed accelerometer frame and counts bus traffic."""
+
+    def __init__(self):
+        self.frame = bytes([0x01, 0x23, 0xFE, 0xDC, 0x40, 0x00])
+        self.transactions = 0
+        self.bytes = 0
+
+    def _account(self, nbytes):
+        # START + addr(W) + reg + RESTART + addr(R) + payload + STOP
+        self.transactions += 1
+        self.bytes += 3 + nbytes
+
+    def readfrom_mem(self, addr, reg, nbytes):
+        self._account(nbytes)
+        offset = reg - mpu6050.ACCEL_XOUT_H
+        return bytes(self.frame[offset:offset + nbytes])
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        self._account(len(buf))
+        offset = reg - mpu6050.ACCEL_XOUT_H
+        buf[:] = self.frame[offset:offset + len(buf)]
+
+    def bus_seconds(self):
+        return self.bytes * BITS_PER_BYTE / I2C_FREQ
+
+
+def read_i2c_word(i2c, register):
+    # Copy of the per-word read that main.py used before the burst path.
+    data = i2c.readfrom_mem(mpu6050.MPU6050_ADDR, register, 2)
+    value = (data[0] << 8) | data[1]
+    if value >= 0x8000:
+        value -= 0x10000
+    gc.collect()
+    return value
+
+
+def legacy_sample(i2c, _mpu):
+    return read_i2c_word(i2c, 0x3B), read_i2c_word(i2c, 0x3D), read_i2c_word(i2c, 0x3F)
+
+
+def burst_sample(_i2c, mpu):
+    return mpu.read_accel_raw()
+
+
+def run(name, sample, num_samples):
+    i2c = FakeI2C()
+    mpu = mpu6050.MPU6050(i2c)
+    start = time.perf_counter()
+    for _ in range(num_samples):
+        sample(i2c, mpu)
+    cpu = time.perf_counter() - start
+    bus = i2c.bus_seconds()
+    print(f"{name:>8}: {num_samples / cpu:10.0f} samples/s host, "
+          f"{num_samples / bus:6.0f} samples/s bus-limited, "
+          f"{i2c.transactions / num_samples:.0f} transactions/sample")
+    return num_samples / cpu
+
+
+def main():
+    num_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    before = run("legacy", legacy_sample, num_samples)
+    after = run("burst", burst_sample, num_samples)
+    print(f"host speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
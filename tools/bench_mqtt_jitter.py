@@ -0,0 +1,190 @@
+"""
+Host-side check that MQTT I/O does not stall sampling.
+
+Starts a minimal MQTT stand-in broker (CONNECT, SUBSCRIBE, PUBLISH QoS 0/1,
+PINGREQ, DISCONNECT) in a background thread that delays every reply by a
+configurable latency. On the main event loop a sampler task wakes every
+10 ms, like the FIFO drain, and records how late each wake-up is. A
+publisher task connects, subscribes and publishes QoS 1 messages through:
+
+  * umqttsimple.MQTTClient, the blocking client, called from a coroutine;
+  * umqttasync.MQTTClient, the asyncio client.
+
+The report gives the sampler's worst and 99th-percentile lateness for each
+client and latency.
+
+    python tools/bench_mqtt_jitter.py [latency_ms ...]
+"""
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+import types
+import binascii
+import struct
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# umqttsimple is written for MicroPython; map its u-modules onto CPython's.
+sys.modules.setdefault("ustruct", struct)
+sys.modules.setdefault("ubinascii", binascii)
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_diff = lambda a, b: a - b
+
+import umqttsimple
+import umqttasync
+
+SAMPLE_PERIOD_MS = 10
+RUN_SECONDS = 3.0
+PUBLISH_EVERY_MS = 200
+
+
+class StandInBroker:
+    """Accepts any client, acknowledges everything after `latency` seconds.
+
+    Runs on its own daemon thread and event loop until the process exits.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = None
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(
+            asyncio.start_server(self._client, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                op = (await reader.readexactly(1))[0]
+                n = sh = 0
+                while True:
+                    b = (await reader.readexactly(1))[0]
+                    n |= (b & 0x7f) << sh
+                    if not b & 0x80:
+                        break
+                    sh += 7
+                body = await reader.readexactly(n)
+                await asyncio.sleep(self.latency)
+                kind = op & 0xf0
+                if kind == 0x10:
+                    writer.write(b"\x20\x02\x00\x00")
+                elif kind == 0x80:
+                    writer.write(b"\x90\x03" + body[:2] + b"\x00")
+                elif kind == 0x30 and op & 6:
+                    topic_len = (body[0] << 8) | body[1]
+                    writer.write(b"\x40\x02" + body[2 + topic_len:4 + topic_len])
+                elif kind == 0xc0:
+                    writer.write(b"\xd0\x00")
+                elif kind == 0xe0:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+
+class _SocketShim:
+    """CPython socket with the read/write methods MicroPython sockets have."""
+
+    def __init__(self):
+        self._sock = socket.socket()
+
+    def connect(self, addr):
+        self._sock.connect(addr)
+
+    def setblocking(self, flag):
+        self._sock.setblocking(flag)
+
+    def write(self, buf, length=None):
+        self._sock.sendall(bytes(buf[:length] if length is not None else buf))
+
+    def read(self, n):
+        data = b""
+        while len(data) < n:
+            try:
+                chunk = self._sock.recv(n - len(data))
+            except BlockingIOError:
+                return None if not data else data
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def close(self):
+        self._sock.close()
+
+
+umqttsimple.socket = types.SimpleNamespace(socket=_SocketShim, getaddrinfo=socket.getaddrinfo)
+
+
+async def sampler(lateness, stop):
+    period = SAMPLE_PERIOD_MS / 1000
+    due = time.perf_counter() + period
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        now = time.perf_counter()
+        lateness.append(now - due)
+        due = max(due + period, now)
+
+
+async def blocking_publisher(port, stop):
+    client = umqttsimple.MQTTClient(b"bench-blocking", "127.0.0.1", port=port, keepalive=60)
+    client.set_callback(lambda topic, msg: None)
+    client.connect()
+    client.subscribe(b"remote_control")
+    while not stop.is_set():
+        client.publish(b"OC7/data/N0", b"x" * 110, qos=1)
+        await asyncio.sleep(PUBLISH_EVERY_MS / 1000)
+    client.disconnect()
+
+
+async def async_publisher(port, stop):
+    client = umqttasync.MQTTClient(b"bench-async", "127.0.0.1", port=port, keepalive=60)
+    client.set_callback(lambda topic, msg: None)
+    await client.connect()
+    await client.subscribe(b"remote_control")
+    while not stop.is_set():
+        await client.publish(b"OC7/data/N0", b"x" * 110, qos=1)
+        await asyncio.sleep(PUBLISH_EVERY_MS / 1000)
+    await client.disconnect()
+
+
+async def measure(publisher, port):
+    lateness = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(sampler(lateness, stop)), asyncio.create_task(publisher(port, stop))]
+    await asyncio.sleep(RUN_SECONDS)
+    stop.set()
+    await asyncio.gather(*tasks)
+    lateness.sort()
+    return lateness[-1] * 1000, lateness[int(len(lateness) * 0.99)] * 1000
+
+
+def main():
+    latencies = [int(arg) for arg in sys.argv[1:]] or [0, 50, 200]
+    print(f"sampler period {SAMPLE_PERIOD_MS} ms, QoS 1 publish every {PUBLISH_EVERY_MS} ms")
+    for latency_ms in latencies:
+        broker = StandInBroker(latency_ms / 1000)
+        broker.start()
+        for name, publisher in (("blocking", blocking_publisher), ("async", async_publisher)):
+            worst, p99 = asyncio.run(measure(publisher, broker.port))
+            print(f"broker latency {latency_ms:4d} ms, {name:>8} client: "
+                  f"sampler lateness max {worst:7.1f} ms, p99 {p99:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+On-device benchmark of the RTD bus backends.
+
+Runs on the ESP32 (not on the host), with max31865.py and spi_device.py
+already on the board:
+
+    mpremote run tools/bench_rtd_spi.py
+
+For SoftSPI and hardware SPI in turn it opens the bus on the pins main.py
+uses, then times MAX31865.read_registers(). That is the single burst
+transaction behind one temperature sample in continuous mode. It prints the
+average CPU time per read for each backend.
+"""
+import time
+import machine
+import max31865
+import spi_device
+
+SCK, MOSI, MISO, CS = 18, 23, 19, 5
+READS = 200
+BACKENDS = (
+    ("soft", 50000),
+    ("soft", 1000000),
+    ("hard", 1000000),
+    ("hard", 5000000),
+)
+
+
+def bench(backend, baudrate):
+    spi = spi_device.open_spi(SCK, MOSI, MISO, backend=backend, baudrate=baudrate,
+                              soft_baudrate=baudrate, polarity=0, phase=1)
+    cs = machine.Pin(CS, machine.Pin.OUT, value=1)
+    sensor = max31865.MAX31865(spi, cs, wires=3, rtd_nominal=100.0, ref_resistor=402.0)
+    sensor.set_continuous(True)
+    time.sleep_ms(100)
+    start = time.ticks_us()
+    for _ in range(READS):
+        rtd = sensor.read_registers()
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    print(f"{backend:>4} @ {baudrate:>7} Hz: {elapsed / READS:8.1f} us/read, "
+          f"last RTD code {rtd >> 1}, fault 0x{sensor.fault_status:02X}")
+    sensor.set_continuous(False)
+    if hasattr(spi, "deinit"):
+        spi.deinit()
+
+
+for backend, baudrate in BACKENDS:
+    try:
+        bench(backend, baudrate)
+    except Exception as e:
+        print(f"{backend} @ {baudrate} Hz failed: {e}")
@@ -0,0 +1,34 @@
+"""
+Host-side report of the MAX31865 lookup-table conversion error.
+
+Prints the worst error of rtd_to_centidegrees() with the lookup table against
+the Callendar-Van Dusen formula, for the RTD/reference pairs we fit. The
+sweep itself lives in tests/test_max31865.py, which enforces the limit
+(python -m pytest tests); this only prints the figures. Exits non-zero if
+any error is above the limit (default LUT_MAX_ERROR_C, 0.05 C).
+
+    python tools/check_rtd_lut.py [max_error_c]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+
+import conftest  # MicroPython stand-ins, the same ones pytest uses
+import test_max31865
+
+
+def main():
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else test_max31865.LUT_MAX_ERROR_C
+    failed = False
+    for rtd_nominal, ref_resistor in test_max31865.LUT_COMBINATIONS:
+        worst, code, entries = test_max31865.lut_max_error(rtd_nominal, ref_resistor)
+        status = "ok" if worst <= limit else "FAIL"
+        failed |= worst > limit
+        print(f"R0={rtd_nominal:g} Rref={ref_resistor:g}: {entries} entries, "
+              f"max error {worst:.4f} C at code {code} [{status}]")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Host-side packer for OTA firmware bundles.
+
+Builds Firmware.tar and Firmware.tar.gz from a node folder, the way
+ota.py expects them: a plain ustar archive with paths relative to the node
+folder, and the same archive gzipped with a deflate window no larger than
+tarstream.GZIP_WBITS, so the ESP32 can decompress it with a small buffer.
+The compressed bundle is checked by decompressing it with that window.
+The first member is the manifest ota.py verifies (bundle.py): size and
+SHA-256 of every file, for the version in the folder's version.json. With
+--key, manifest.sig carries an HMAC-SHA256 of the manifest made with the key
+file, which must match the /ota.key on the nodes.
+Prints the transfer size of both bundles and the download time they take at
+a few link rates.
+
+    python tools/pack_firmware.py node_6 [--key ota.key] [B/s ...]
+"""
+import binascii
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bundle
+import tarstream
+
+# Kept out of bundles: docs, the version file the updater rewrites, and earlier bundles.
+EXCLUDE = ("README.md", "version.json", "Firmware.tar", "Firmware.tar.gz", "__pycache__")
+# Sustained OTA download rates to estimate with, in bytes/s (weak plant Wi-Fi to a good link).
+RATES = (5000, 20000, 100000)
+
+
+def bundle_files(folder):
+    files = []
+    for root, dirs, names in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDE)
+        for name in sorted(names):
+            if name not in EXCLUDE and not name.endswith(".pyc"):
+                path = os.path.join(root, name)
+                files.append((path, os.path.relpath(path, folder).replace(os.sep, "/")))
+    return files
+
+
+def build_manifest(files, version):
+    entries = {}
+    for path, name in files:
+        with open(path, "rb") as f:
+            data = f.read()
+        entries[name] = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    return json.dumps({"version": version, "files": entries}, sort_keys=True).encode()
+
+
+def build_tar(files, members=()):
+    # Fixed owner and mtime, so packing the same files gives byte-identical bundles.
+    # members are (name, bytes) written ahead of the files, e.g. the manifest.
+    out = io.BytesIO()
+    with tarfile.open(fileobj=out, mode="w", format=tarfile.USTAR_FORMAT) as tar:
+        contents = list(members)
+        for path, name in files:
+            with open(path, "rb") as f:
+                contents.append((name, f.read()))
+        for name, data in contents:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return out.getvalue()
+
+
+def gzip_bounded(data):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + tarstream.GZIP_WBITS)
+    packed = compressor.compress(data) + compressor.flush()
+    # Decompress with the window the node will use; fails if any match reaches further back.
+    if zlib.decompressobj(16 + tarstream.GZIP_WBITS).decompress(packed) != data:
+        raise SystemExit("compressed bundle does not round-trip")
+    return packed
+
+
+def main():
+    args = sys.argv[1:]
+    key = None
+    if "--key" in args:
+        i = args.index("--key")
+        with open(args[i + 1], "rb") as f:
+            key = f.read().strip()
+        del args[i:i + 2]
+    folder = args[0] if args else "."
+    rates = [int(arg) for arg in args[1:]] or RATES
+    with open(os.path.join(folder, "version.json")) as f:
+        version = json.load(f)["version"]
+    files = bundle_files(folder)
+    manifest = build_manifest(files, version)
+    members = [(bundle.MANIFEST, manifest)]
+    if key:
+        members.append((bundle.SIGNATURE, binascii.hexlify(bundle.hmac_sha256(key, manifest))))
+    tar = build_tar(files, members)
+    packed = gzip_bounded(tar)
+    with open(os.path.join(folder, "Firmware.tar"), "wb") as f:
+        f.write(tar)
+    with open(os.path.join(folder, "Firmware.tar.gz"), "wb") as f:
+        f.write(packed)
+    print(f"{len(files)} files from {folder}: {', '.join(name for _, name in files)}")
+    print(f"manifest for version {version}, {'signed' if key else 'unsigned'}")
+    print(f"Firmware.tar     {len(tar):8d} bytes")
+    print(f"Firmware.tar.gz  {len(packed):8d} bytes ({100 * len(packed) / len(tar):.0f} %, "
+          f"{1 << tarstream.GZIP_WBITS} byte window)")
+    for rate in rates:
+        print(f"at {rate:6d} B/s: {len(tar) / rate:6.1f} s -> {len(packed) / rate:6.1f} s, "
+              f"{(len(tar) - len(packed)) / rate:6.1f} s saved per node")
+
+
+if __name__ == "__main__":
+    main()
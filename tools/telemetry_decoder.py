@@ -0,0 +1,93 @@
+"""
+Host-side decoder for the binary telemetry payload built by telemetry.py.
+
+Import decode() from a subscriber, or run it on hex dumps of payloads:
+
+    python tools/telemetry_decoder.py 0109060100...
+    mosquitto_sub -t "OC7/data/N6" -F %x | python tools/telemetry_decoder.py
+
+Text payloads (PAYLOAD_FORMAT = "text" in main.py) are passed through as-is;
+batch frames (BATCH_SIZE > 1) are split into their readings.
+"""
+import json
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import telemetry
+
+
+def decode(payload):
+    """Decode one payload into a dict; text payloads come back as {"text": ...}.
+
+    Batch frames come back as {"ts": ..., "batch": [...]}, one decoded reading
+    per entry, each with "ms", its offset from the first reading.
+    """
+    payload = bytes(payload)
+    if payload[:1] == b"N":
+        lines = payload.decode().split("\n")
+        if len(lines) == 1:
+            return {"text": lines[0]}
+        return {"batch": [{"text": line} for line in lines]}
+    if payload[:1] == bytes((telemetry.BATCH_VERSION,)):
+        return decode_batch(payload)
+    if len(payload) < telemetry.HEADER_SIZE + telemetry.VALUES_SIZE:
+        raise ValueError(f"payload too short ({len(payload)} bytes)")
+    version, status, node, seq, fw, timestamp = struct.unpack_from(telemetry.HEADER_FORMAT, payload, 0)
+    if version != telemetry.VERSION:
+        raise ValueError(f"unknown payload version {version}")
+    ax, ay, az, vx, vy, vz, channels = struct.unpack_from(telemetry.VALUES_FORMAT, payload, telemetry.HEADER_SIZE)
+    offset = telemetry.HEADER_SIZE + telemetry.VALUES_SIZE
+    if len(payload) < offset + channels * telemetry.CHANNEL_SIZE:
+        raise ValueError(f"payload truncated, {channels} RTD channels announced")
+    rtd = []
+    for _ in range(channels):
+        t, fault = struct.unpack_from(telemetry.CHANNEL_FORMAT, payload, offset)
+        rtd.append({"temp": None if t == telemetry.TEMP_INVALID else t / 100, "fault": fault})
+        offset += telemetry.CHANNEL_SIZE
+    accel = status & telemetry.STATUS_ACCEL
+    velocity = status & telemetry.STATUS_VELOCITY
+    return {
+        "version": version,
+        "node": node,
+        "seq": seq,
+        "fw": fw,
+        "ts": timestamp,
+        "clock_synced": bool(status & telemetry.STATUS_CLOCK),
+        "acc": (ax / 10000, ay / 10000, az / 10000) if accel else None,
+        "vel": (vx / 100, vy / 100, vz / 100) if velocity else None,
+        "temp": rtd[0]["temp"] if rtd and status & telemetry.STATUS_TEMPERATURE else None,
+        "rtd": rtd,
+    }
+
+
+def decode_batch(payload):
+    if len(payload) < telemetry.BATCH_HEADER_SIZE:
+        raise ValueError(f"batch frame too short ({len(payload)} bytes)")
+    _, count, timestamp = struct.unpack_from(telemetry.BATCH_HEADER_FORMAT, payload, 0)
+    offset = telemetry.BATCH_HEADER_SIZE
+    batch = []
+    for _ in range(count):
+        if len(payload) < offset + telemetry.BATCH_RECORD_SIZE:
+            raise ValueError(f"batch frame truncated, {count} readings announced")
+        ms, length = struct.unpack_from(telemetry.BATCH_RECORD_FORMAT, payload, offset)
+        offset += telemetry.BATCH_RECORD_SIZE
+        reading = decode(payload[offset:offset + length])
+        reading["ms"] = ms
+        batch.append(reading)
+        offset += length
+    return {"ts": timestamp, "batch": batch}
+
+
+def main():
+    lines = sys.argv[1:] or sys.stdin
+    for line in lines:
+        line = line.strip()
+        if line:
+            print(json.dumps(decode(bytes.fromhex(line))))
+
+
+if __name__ == "__main__":
+    main()